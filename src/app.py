@@ -5,26 +5,49 @@ Refactored FastAPI Application
 - Smart API fallback
 - Analytics-driven chatbot
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
-import pandas as pd
+import orjson
+import re
+import time
+import hashlib
+import secrets
+from collections import OrderedDict
 import os
+import sys
 
 from src.json_kb import JSONKnowledgeBase
 from src.llm import LLMGenerator
+from src.nlp import IntentParser
 
-app = FastAPI(title="Saylani Medical Help Desk API - Refactored")
+# orjson serializes the nested KB payloads much faster than stdlib json
+app = FastAPI(
+    title="Saylani Medical Help Desk API - Refactored",
+    default_response_class=ORJSONResponse
+)
+
+# Compress larger JSON payloads (analytics data, LLM answers)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # Add CORS middleware for frontend connectivity
+# Explicit origins/methods let the middleware skip the wildcard path and
+# browsers cache preflight responses (max_age)
+ALLOWED_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("ALLOWED_ORIGINS", "http://localhost:8501,http://localhost:3000").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify your frontend domain
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,
 )
 
 
@@ -32,17 +55,241 @@ app.add_middleware(
 kb = JSONKnowledgeBase()
 llm = LLMGenerator()
 
+# KB context text is static between reloads - rebuild at most every 5 minutes
+CONTEXT_TTL_SECONDS = 300
+_ctx_cache = {"t": 0.0, "v": None, "h": b""}
+
+def get_cached_context():
+    """Return kb.get_full_context(), cached with a TTL"""
+    now = time.time()
+    if _ctx_cache["v"] is None or now - _ctx_cache["t"] >= CONTEXT_TTL_SECONDS:
+        _ctx_cache["v"] = kb.get_full_context()
+        _ctx_cache["h"] = hashlib.blake2b(_ctx_cache["v"].encode(), digest_size=16).digest()
+        _ctx_cache["t"] = now
+    return _ctx_cache["v"]
+
+def invalidate_context_cache():
+    _ctx_cache["v"] = None
+    _ctx_cache["t"] = 0.0
+
+
+class AnswerCache:
+    """Small in-memory LRU cache with per-entry TTL for LLM answers"""
+
+    def __init__(self, max_size=256, ttl_minutes=30):
+        self.max_size = max_size
+        self.ttl = ttl_minutes * 60
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def make_key(query, context_hash):
+        base = query.lower().strip().encode() + b"|" + context_hash
+        return hashlib.blake2b(base, digest_size=16).hexdigest()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.time())
+        self._entries.move_to_end(key)
+        # Evict oldest entries (insertion order)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+answer_cache = AnswerCache(max_size=256, ttl_minutes=30)
+
+
+@app.on_event("startup")
+async def warm_up_llm():
+    # Configure + select the Gemini model once per worker, before traffic arrives
+    await run_in_threadpool(llm.init_model)
+
+
+# Query tokenizer shared by all keyword routing
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+def tokenize_query(query):
+    """Lowercase a query once and return (query_lower, token set)"""
+    query_lower = query.lower()
+    return query_lower, frozenset(_TOKEN_RE.findall(query_lower))
+
+# Keywords that indicate analytics queries
+# Whole-token matching, so inflected forms are listed explicitly (the old
+# substring check caught "trending", "counts", "compared", ... implicitly)
+ANALYTICS_SINGLE = frozenset({
+    'trend', 'trends', 'trending', 'trended', 'workload', 'workloads',
+    'busy', 'busiest', 'prevalent', 'prevalence',
+    'distribution', 'distributions', 'geographic', 'geographical', 'geographically',
+    'branch', 'branches', 'area', 'areas', 'location', 'locations',
+    'summary', 'summaries', 'analytics', 'dashboard', 'dashboards',
+    'statistics', 'statistic', 'statistical', 'stats',
+    'data', 'dataset', 'datasets', 'database', 'total', 'totals',
+    'count', 'counts', 'counted', 'counting', 'patients', 'visits', 'cases',
+    'top', 'highest', 'lowest', 'average', 'averages', 'averaged',
+    'comparison', 'comparisons', 'compare', 'compared', 'compares', 'comparing'
+})
+ANALYTICS_MULTI = ('most common', 'how many')
+ANALYTICS_PHRASE_RE = re.compile("|".join(map(re.escape, ANALYTICS_MULTI)))
+
+# Keywords that indicate medical questions
+# Whole-token matching, so inflected forms are listed explicitly (the old
+# substring check caught "headaches", "fevers", ... implicitly)
+MEDICAL_SINGLE = frozenset({
+    'symptom', 'symptoms', 'treatment', 'treatments', 'cure', 'cures', 'cured',
+    'medicine', 'medicines', 'medication', 'medications',
+    'diagnosis', 'diagnoses', 'diagnose', 'diagnosed',
+    'prevent', 'prevents', 'prevented', 'preventing', 'prevention',
+    'contagious', 'infection', 'infections', 'infected', 'infectious',
+    'sinus', 'sinusitis', 'cold', 'colds', 'flu', 'fever', 'fevers', 'feverish',
+    'pain', 'pains', 'painful', 'ache', 'aches', 'aching',
+    'headache', 'headaches', 'backache', 'backaches',
+    'stomachache', 'stomachaches', 'toothache', 'toothaches'
+})
+MEDICAL_MULTI = ('difference between', 'what is', 'how to treat', 'causes of', 'disease information')
+MEDICAL_PHRASE_RE = re.compile("|".join(map(re.escape, MEDICAL_MULTI)))
+
+def classify_query(query_lower, tokens):
+    """(is_medical, is_analytics) for a tokenized query"""
+    is_medical = bool(tokens & MEDICAL_SINGLE) or MEDICAL_PHRASE_RE.search(query_lower) is not None
+    is_analytics = bool(tokens & ANALYTICS_SINGLE) or ANALYTICS_PHRASE_RE.search(query_lower) is not None
+    return is_medical, is_analytics
+
+MEDICAL_NOTICE = """**Medical Information Notice**
+
+I'm an **Analytics Assistant** for the Saylani Medical Help Desk, designed to provide insights about:
+- Disease trends and statistics
+- Doctor workload and availability
+- Geographic distribution of patients
+- Help desk performance metrics
+
+**I cannot provide medical advice or information about diseases, symptoms, or treatments.**
+
+For medical questions like yours, please:
+1. **Consult a qualified healthcare professional**
+2. **Visit a Saylani Medical Help Desk branch**
+3. **Call our medical hotline for professional advice**
+
+However, I can help you with questions like:
+- "What are the most common diseases in our help desk?"
+- "Which doctors are available in Gulshan area?"
+- "What is the patient volume trend this month?"
+- "Which branch has the highest workload?"
+
+Would you like to ask an analytics-related question instead?"""
+
+# Intents answerable straight from a KB section (no LLM round-trip).
+# A query needs at least 2 matching tokens, and a single best intent, to qualify.
+INTENT_MAP = {
+    frozenset({'trend', 'trends', 'trending', 'disease', 'diseases', 'common', 'prevalent', 'illness'}):
+        ("Disease Analysis", kb.format_disease_trends),
+    frozenset({'workload', 'workloads', 'doctor', 'doctors', 'busy', 'busiest', 'staff'}):
+        ("Staff Performance", kb.format_doctor_workload),
+    frozenset({'geographic', 'branch', 'branches', 'area', 'areas', 'location', 'locations', 'region'}):
+        ("Geographic Reach", kb.format_geographic_distribution),
+    frozenset({'summary', 'overview', 'stats', 'statistics', 'total'}):
+        ("Executive Summary", kb.format_summary),
+}
+
+def match_direct_intent(tokens):
+    """Return (title, formatter) for an unambiguous KB intent, else None"""
+    scores = sorted(
+        ((len(keys & tokens), intent) for keys, intent in INTENT_MAP.items()),
+        key=lambda item: item[0],
+        reverse=True
+    )
+    best_score, best = scores[0]
+    if best_score < 2 or scores[1][0] == best_score:
+        return None
+    return best
+
+# Words that never name a specific place or doctor (routing keywords, titles)
+GENERIC_ENTITY_TOKENS = ANALYTICS_SINGLE.union(*INTENT_MAP, {'dr', 'medical', 'hospital', 'clinic', 'center', 'centre'})
+
+# Time qualifiers; digits (years, dates) are checked separately
+DATE_WORDS = frozenset({
+    'january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+    'september', 'october', 'november', 'december',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+    'today', 'yesterday', 'tomorrow', 'weekend', 'daily', 'week', 'weeks', 'weekly',
+    'month', 'months', 'monthly', 'year', 'years', 'yearly', 'date', 'dates'
+})
+_DIGIT_RE = re.compile(r"\d")
+
+intent_parser = IntentParser()
+
+def build_entity_tokens():
+    """Lowercase branch, area and doctor-name tokens from the KB entities and IntentParser"""
+    entities = (kb.kb_data or {}).get("entities", {})
+    names = [branch.get(field) or "" for branch in entities.get("branches", []) for field in ("branch_name", "area")]
+    names += [doctor.get("name") or "" for doctor in entities.get("doctors", [])]
+    names += IntentParser.AREAS
+    return frozenset(_TOKEN_RE.findall(" ".join(names).lower())) - GENERIC_ENTITY_TOKENS
+
+ENTITY_TOKENS = build_entity_tokens()
+
+def is_scoped_query(query, tokens):
+    """True when a query names an area, branch, doctor or date the KB sections don't break down by"""
+    if tokens & ENTITY_TOKENS or tokens & DATE_WORDS or _DIGIT_RE.search(query):
+        return True
+    entities = intent_parser.extract_entities(query)
+    return "DOCTOR_NAME" in entities or "AREA" in entities
+
+# Pre-serialized medical redirect response, split around the echoed query
+MEDICAL_RESPONSE_HEAD = b'{"success":true,"query":'
+MEDICAL_RESPONSE_TAIL = b"," + orjson.dumps({
+    "answer": MEDICAL_NOTICE,
+    "source": "System Response",
+    "api_used": False,
+    "query_type": "medical_question"
+})[1:]
+
 # Models
-class QueryRequest(BaseModel):
-    query: str
+# Query bodies ({"query": "..."}) are parsed with orjson in read_query() rather
+# than through a Pydantic model; this schema keeps them documented in /docs
+QUERY_BODY_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "required": ["query"],
+                    "properties": {"query": {"type": "string"}}
+                }
+            }
+        }
+    }
+}
 
-class AnalyticsRequest(BaseModel):
-    metric: str  # 'disease_trends', 'doctor_workload', 'geographic_distribution'
+async def read_query(request: Request):
+    """Extract and validate the "query" string from a raw JSON body"""
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=422, detail="Request body must be valid JSON")
+    query = payload.get("query") if isinstance(payload, dict) else None
+    # Same contract as the old Pydantic model: any string, including ""
+    if not isinstance(query, str):
+        raise HTTPException(status_code=422, detail="query required")
+    return query
 
 # Endpoints
 
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "Saylani Medical Help Desk API - Refactored",
         "version": "2.0",
@@ -55,7 +302,7 @@ def root():
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
@@ -63,159 +310,120 @@ def health_check():
         "api_available": llm.api_available
     }
 
-@app.get("/analytics/disease-trends")
-def get_disease_trends():
-    """Get disease trends from JSON KB"""
-    try:
-        if kb.kb_data is None:
-            raise HTTPException(status_code=503, detail="Knowledge base not loaded")
-        
-        data = kb.query_disease_trends()
-        
-        if not data:
-            raise HTTPException(status_code=404, detail="Disease trends data not found in knowledge base")
-        
-        return {"success": True, "data": data}
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error in get_disease_trends: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+# Metric name -> (KB query, human readable name for errors)
+ANALYTICS_HANDLERS = {
+    "disease-trends": (kb.query_disease_trends, "Disease trends"),
+    "doctor-workload": (kb.query_doctor_workload, "Doctor workload"),
+    "geographic-distribution": (kb.query_geographic_distribution, "Geographic distribution"),
+    "summary": (kb.query_summary, "Summary"),
+}
 
-@app.get("/analytics/doctor-workload")
-def get_doctor_workload():
-    """Get doctor workload from JSON KB"""
-    try:
-        if kb.kb_data is None:
-            raise HTTPException(status_code=503, detail="Knowledge base not loaded")
-        
-        data = kb.query_doctor_workload()
-        
-        if not data:
-            raise HTTPException(status_code=404, detail="Doctor workload data not found in knowledge base")
-        
-        return {"success": True, "data": data}
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error in get_doctor_workload: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+# Serialized responses per metric - KB data only changes on reload
+_analytics_cache = {}
 
-@app.get("/analytics/geographic-distribution")
-def get_geographic_distribution():
-    """Get geographic distribution from JSON KB"""
-    try:
-        if kb.kb_data is None:
-            raise HTTPException(status_code=503, detail="Knowledge base not loaded")
-        
-        data = kb.query_geographic_distribution()
-        
-        if not data:
-            raise HTTPException(status_code=404, detail="Geographic distribution data not found in knowledge base")
-        
-        return {"success": True, "data": data}
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"Error in get_geographic_distribution: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+def compute_kb_etag():
+    """Stable validator for the loaded KB; changes whenever the KB content does"""
+    digest = hashlib.blake2b(orjson.dumps(kb.kb_data or {}), digest_size=8).hexdigest()
+    return f'"{digest}"'
 
-@app.get("/analytics/summary")
-def get_summary():
-    """Get executive summary from JSON KB"""
+KB_ETAG = compute_kb_etag()
+ANALYTICS_CACHE_HEADERS = {"Cache-Control": "public, max-age=60"}
+
+def require_kb():
+    """Dependency: fail fast with 503 when the knowledge base isn't loaded"""
+    if kb.kb_data is None:
+        raise HTTPException(status_code=503, detail="Knowledge base not loaded")
+    return kb
+
+@app.get("/analytics/{metric}", dependencies=[Depends(require_kb)])
+async def get_analytics(metric: str, request: Request):
+    """Get disease trends, doctor workload, geographic distribution or summary from JSON KB"""
     try:
-        if kb.kb_data is None:
-            raise HTTPException(status_code=503, detail="Knowledge base not loaded")
+        handler = ANALYTICS_HANDLERS.get(metric)
+        if handler is None:
+            raise HTTPException(status_code=404, detail=f"Unknown analytics metric: {metric}")
         
-        data = kb.query_summary()
+        # Client already has the current version - skip serialize and send
+        headers = {**ANALYTICS_CACHE_HEADERS, "ETag": KB_ETAG}
+        if request.headers.get("if-none-match") == KB_ETAG:
+            return Response(status_code=304, headers=headers)
         
-        if not data:
-            raise HTTPException(status_code=404, detail="Summary data not found in knowledge base")
+        body = _analytics_cache.get(metric)
+        if body is None:
+            query, label = handler
+            data = query()
+            
+            if not data:
+                raise HTTPException(status_code=404, detail=f"{label} data not found in knowledge base")
+            
+            body = orjson.dumps({"success": True, "data": data})
+            _analytics_cache[metric] = body
         
-        return {"success": True, "data": data}
+        return Response(content=body, media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_summary: {str(e)}")
+        print(f"Error in get_analytics ({metric}): {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
-@app.post("/chat/query")
-def chat_query(request: QueryRequest):
+@app.post("/chat/query", openapi_extra=QUERY_BODY_SCHEMA)
+async def chat_query(request: Request):
     """
     Analytics chatbot endpoint
     - Uses Gemini API if available
     - Falls back to JSON KB extraction if API fails/quota exceeded
     """
+    query = await read_query(request)
     try:
         # Detect query type
-        query_lower = request.query.lower()
-        
-        # Keywords that indicate analytics queries
-        analytics_keywords = [
-            'trend', 'workload', 'busy', 'most common', 'prevalent', 
-            'distribution', 'geographic', 'branch', 'area', 'location',
-            'summary', 'analytics', 'dashboard', 'statistics', 'data',
-            'how many', 'total', 'count', 'patients', 'visits', 'cases',
-            'top', 'highest', 'lowest', 'average', 'comparison', 'compare'
-        ]
-        
-        # Keywords that indicate medical questions
-        medical_keywords = [
-            'symptom', 'treatment', 'cure', 'medicine', 'diagnosis',
-            'difference between', 'what is', 'how to treat', 'causes of',
-            'prevent', 'contagious', 'infection', 'disease information',
-            'sinus', 'cold', 'flu', 'fever', 'pain', 'ache'
-        ]
-        
-        # Check if it's a medical question
-        is_medical = any(keyword in query_lower for keyword in medical_keywords)
-        is_analytics = any(keyword in query_lower for keyword in analytics_keywords)
+        # Tokenize once; single words are set lookups, phrases one precompiled scan
+        query_lower, tokens = tokenize_query(query)
+        is_medical, is_analytics = classify_query(query_lower, tokens)
         
         # If it's clearly a medical question and not analytics
         if is_medical and not is_analytics:
+            # Constant body prebuilt at import time; only the echoed query is serialized
+            return Response(
+                content=MEDICAL_RESPONSE_HEAD + orjson.dumps(query) + MEDICAL_RESPONSE_TAIL,
+                media_type="application/json"
+            )
+        
+        # Clear-cut, unscoped analytics intents are answered directly from the KB;
+        # "top diseases in Gulshan" needs the LLM, the sections are global
+        direct = match_direct_intent(tokens) if kb.kb_data and not is_scoped_query(query, tokens) else None
+        if direct is not None:
+            title, formatter = direct
             return {
                 "success": True,
-                "query": request.query,
-                "answer": """**Medical Information Notice**
-
-I'm an **Analytics Assistant** for the Saylani Medical Help Desk, designed to provide insights about:
-- Disease trends and statistics
-- Doctor workload and availability
-- Geographic distribution of patients
-- Help desk performance metrics
-
-**I cannot provide medical advice or information about diseases, symptoms, or treatments.**
-
-For medical questions like yours, please:
-1. **Consult a qualified healthcare professional**
-2. **Visit a Saylani Medical Help Desk branch**
-3. **Call our medical hotline for professional advice**
-
-However, I can help you with questions like:
-- "What are the most common diseases in our help desk?"
-- "Which doctors are available in Gulshan area?"
-- "What is the patient volume trend this month?"
-- "Which branch has the highest workload?"
-
-Would you like to ask an analytics-related question instead?""",
-                "source": "System Response",
+                "query": query,
+                "answer": f"**{title}**\n{formatter()}\n\n---\n*Answered directly from Analytics Knowledge Base*",
+                "source": "JSON Knowledge Base (Direct)",
                 "api_used": False,
-                "query_type": "medical_question"
+                "query_type": "analytics"
             }
         
         # Get full context from JSON KB for analytics queries
-        context_text = kb.get_full_context()
+        context_text = get_cached_context()
+        cache_key = AnswerCache.make_key(query, _ctx_cache["h"])
         
-        # Generate answer (with automatic fallback)
-        answer = llm.generate_answer(request.query, context_text)
-        
-        # Determine actual source
-        source_type = "Gemini API" if llm.api_available and "Extracted from Analytics Knowledge Base" not in answer else "JSON Knowledge Base (Fallback)"
+        answer = answer_cache.get(cache_key)
+        if answer is not None:
+            source_type = "Gemini API"
+        else:
+            # Generate answer (with automatic fallback); the blocking API call runs in the threadpool
+            answer = await run_in_threadpool(llm.generate_answer, query, context_text)
+            
+            # Determine actual source
+            source_type = "Gemini API" if llm.api_available and "Extracted from Analytics Knowledge Base" not in answer else "JSON Knowledge Base (Fallback)"
+            
+            # Only cache real API answers so fallbacks are retried once the API recovers
+            if source_type == "Gemini API":
+                answer_cache.set(cache_key, answer)
         
         return {
             "success": True,
-            "query": request.query,
+            "query": query,
             "answer": answer,
             "source": source_type,
             "api_used": llm.api_available,
@@ -224,17 +432,41 @@ Would you like to ask an analytics-related question instead?""",
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/analytics/search")
-def search_analytics(request: QueryRequest):
+# Shared secret for admin endpoints; unset means admin endpoints always refuse
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(x_admin_token: str = Header(default="")):
+    """Dependency: 403 unless the X-Admin-Token header matches ADMIN_TOKEN"""
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.post("/admin/reload", dependencies=[Depends(require_admin)])
+async def reload_knowledge_base():
+    """Reload the JSON KB from disk and drop cached context (this worker only)"""
+    global KB_ETAG, ENTITY_TOKENS
+    try:
+        await run_in_threadpool(kb.load)
+        KB_ETAG = compute_kb_etag()
+        ENTITY_TOKENS = build_entity_tokens()
+        invalidate_context_cache()
+        answer_cache.clear()
+        _analytics_cache.clear()
+        return {"success": True, "kb_loaded": bool(kb.kb_data)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/analytics/search", openapi_extra=QUERY_BODY_SCHEMA)
+async def search_analytics(request: Request):
     """
     Search JSON KB for specific analytics data
     Returns structured JSON data
     """
+    query = await read_query(request)
     try:
-        results = kb.search(request.query)
+        results = kb.search(query)
         return {
             "success": True,
-            "query": request.query,
+            "query": query,
             "results": results
         }
     except Exception as e:
@@ -242,5 +474,15 @@ def search_analytics(request: QueryRequest):
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Multiple workers need an import string; each worker loads KB + LLM once at import.
+    # uvloop is not available on Windows, so fall back to the default asyncio loop there.
+    uvicorn.run(
+        "src.app:app",
+        host="0.0.0.0",
+        port=port,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        log_level="warning"
+    )
 
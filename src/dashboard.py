@@ -4,12 +4,12 @@ import plotly.express as px
 import plotly.graph_objects as go
 import os
 import sys
+import threading
 
 # Add project root to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.data_cleaning import main as clean_data_main
-from src.json_kb_generator import JSONKnowledgeBaseGenerator
 
 # Page config with custom theme
 st.set_page_config(
@@ -19,181 +19,16 @@ st.set_page_config(
     page_icon=""
 )
 
+THEME_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "theme.css")
+
+@st.cache_data
+def _css():
+    """Theme stylesheet, read from disk once per process"""
+    with open(THEME_CSS_PATH, encoding="utf-8") as f:
+        return f.read()
+
 # Custom CSS for high-contrast professional theme
-st.markdown("""
-<style>
-    /* ... (CSS styles kept as is) ... */
-    /* Main background - Very Dark Navy */
-    .main {
-        background-color: #0A1929;
-    }
-    
-    /* Metric cards - Dark Slate Blue containers */
-    .stMetric {
-        background-color: #14344F !important;
-        padding: 20px !important;
-        border-radius: 10px !important;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.5) !important;
-        border: 1px solid rgba(79, 159, 253, 0.2) !important;
-    }
-    
-    /* Metric labels - Very Light Blue-Grey */
-    .stMetric label {
-        color: #E0E7FF !important;
-        font-weight: 600 !important;
-        font-size: 14px !important;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    /* Metric values - Very Light Blue-Grey */
-    .stMetric [data-testid="stMetricValue"] {
-        color: #E0E7FF !important;
-        font-size: 32px !important;
-        font-weight: 700 !important;
-    }
-    
-    /* Metric delta - Vibrant Azure */
-    .stMetric [data-testid="stMetricDelta"] {
-        color: #4F9FFD !important;
-    }
-    
-    /* Headers - Very Light Blue-Grey */
-    h1 {
-        color: #E0E7FF !important;
-        font-weight: 700 !important;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.3);
-    }
-    h2, h3 {
-        color: #E0E7FF !important;
-        font-weight: 600 !important;
-    }
-    
-    /* Sidebar - Dark Slate Blue */
-    .css-1d391kg, [data-testid="stSidebar"] {
-        background-color: #14344F !important;
-        border-right: 1px solid rgba(79, 159, 253, 0.2);
-    }
-    
-    .css-1d391kg p, [data-testid="stSidebar"] p {
-        color: #E0E7FF !important;
-    }
-    
-    .css-1d391kg h1, .css-1d391kg h2, .css-1d391kg h3,
-    [data-testid="stSidebar"] h1, [data-testid="stSidebar"] h2, [data-testid="stSidebar"] h3 {
-        color: #E0E7FF !important;
-    }
-    
-    /* Context and answer boxes */
-    .context-box {
-        background-color: #14344F !important;
-        padding: 15px !important;
-        border-radius: 8px !important;
-        border-left: 4px solid #4F9FFD !important;
-        margin: 10px 0 !important;
-        color: #E0E7FF !important;
-    }
-    
-    .answer-box {
-        background-color: #14344F !important;
-        padding: 20px !important;
-        border-radius: 10px !important;
-        border-left: 4px solid #4F9FFD !important;
-        margin: 15px 0 !important;
-        font-size: 16px !important;
-        line-height: 1.6 !important;
-        color: #E0E7FF !important;
-    }
-    
-    .answer-box h4 {
-        color: #4F9FFD !important;
-    }
-    
-    /* Input fields */
-    .stTextInput input {
-        background-color: #14344F !important;
-        color: #E0E7FF !important;
-        border: 2px solid #4F9FFD !important;
-    }
-    
-    .stTextInput input::placeholder {
-        color: #9AA5B1 !important;
-    }
-    
-    /* Buttons - Vibrant Azure */
-    .stButton button {
-        background-color: #4F9FFD !important;
-        color: #0A1929 !important;
-        font-weight: 600 !important;
-        border: none !important;
-        padding: 10px 24px !important;
-        border-radius: 6px !important;
-        transition: all 0.3s ease;
-    }
-    
-    .stButton button:hover {
-        background-color: #6BB0FF !important;
-        box-shadow: 0 4px 12px rgba(79, 159, 253, 0.4);
-    }
-    
-    /* Expander */
-    .streamlit-expanderHeader {
-        background-color: #14344F !important;
-        color: #E0E7FF !important;
-        font-weight: 600 !important;
-        border: 1px solid rgba(79, 159, 253, 0.2);
-    }
-    
-    /* Selectbox */
-    .stSelectbox label {
-        color: #E0E7FF !important;
-        font-weight: 600 !important;
-    }
-    
-    .stSelectbox div[data-baseweb="select"] {
-        background-color: #14344F !important;
-        border-color: #4F9FFD !important;
-    }
-    
-    /* Info/Warning boxes */
-    .stAlert {
-        border-radius: 10px !important;
-        background-color: #14344F !important;
-        color: #E0E7FF !important;
-        border: 1px solid rgba(79, 159, 253, 0.3);
-    }
-    
-    /* Plotly charts background - Dark Slate Blue */
-    .js-plotly-plot {
-        background-color: #14344F !important;
-        border-radius: 10px !important;
-        padding: 10px !important;
-        border: 1px solid rgba(79, 159, 253, 0.2);
-    }
-    
-    /* Plotly chart paper background */
-    .plot-container {
-        background-color: #14344F !important;
-    }
-    
-    /* Divider */
-    hr {
-        border-color: rgba(79, 159, 253, 0.2) !important;
-    }
-    
-    /* Markdown text */
-    .stMarkdown {
-        color: #E0E7FF !important;
-    }
-    
-    /* Code blocks */
-    code {
-        background-color: #14344F !important;
-        color: #4F9FFD !important;
-        border: 1px solid rgba(79, 159, 253, 0.2);
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(f"<style>{_css()}</style>", unsafe_allow_html=True)
 
 # Title with high-contrast theme
 st.markdown("""
@@ -202,14 +37,22 @@ Saylani Medical Help Desk Analytics
 </h1>
 """, unsafe_allow_html=True)
 
+KB_PATH = "data/knowledge_base/analytics_kb.json"
+
+# Only these columns are rendered; the rest are never read from the Parquet file
+DASHBOARD_COLUMNS = [
+    'branch_name', 'doctor_name', 'disease_name', 'area',
+    'gender', 'specialty', 'visit_timestamp'
+]
+
 # Load Data first (before sidebar filters)
-@st.cache_data
-def load_data():
-    csv_path = "data/cleaned/appointments.csv"
-    kb_path = "data/knowledge_base/analytics_kb.json"
+@st.cache_resource
+def _load_df():
+    """Load the appointments frame once per process (read-only: shared, never hashed or copied)"""
+    data_path = "data/cleaned/appointments.parquet"
     
-    # 1. Check and generate CSVs if missing
-    if not os.path.exists(csv_path):
+    # Check and generate cleaned Parquet files if missing
+    if not os.path.exists(data_path):
         with st.spinner("Data not found. Generating data from raw files..."):
             try:
                 os.makedirs("data/cleaned", exist_ok=True)
@@ -219,36 +62,144 @@ def load_data():
                 st.error(f"Failed to generate data: {str(e)}")
                 return None
 
-    # 2. Check and generate Knowledge Base (JSON) if missing
-    if not os.path.exists(kb_path):
-        with st.spinner("Building AI Knowledge Base..."):
-            try:
-                kb_gen = JSONKnowledgeBaseGenerator()
-                
-                # Load necessary DFs for KB generation
-                doctors = pd.read_csv("data/cleaned/doctors.csv")
-                branches = pd.read_csv("data/cleaned/branches.csv")
-                diseases = pd.read_csv("data/cleaned/diseases.csv")
-                appointments = pd.read_csv("data/cleaned/appointments.csv")
-                
-                kb_gen.generate_from_data(doctors, branches, diseases, appointments)
-                st.success("Knowledge Base built successfully!")
-            except Exception as e:
-                st.warning(f"Could not build Knowledge Base: {e}")
-                # Don't stop execution, just warn
-
-    if os.path.exists(csv_path):
-        return pd.read_csv(csv_path)
+    if os.path.exists(data_path):
+        return pd.read_parquet(data_path, columns=DASHBOARD_COLUMNS, engine="pyarrow")
     return None
 
-df = load_data()
+def _build_kb():
+    """Generate the Knowledge Base JSON from the cleaned Parquet files"""
+    try:
+        # Imported here so reruns with an existing KB never load the generator module
+        from src.json_kb_generator import JSONKnowledgeBaseGenerator, KB_PATIENT_COLUMNS
+        kb_gen = JSONKnowledgeBaseGenerator()
+        
+        # Load necessary DFs for KB generation
+        doctors = pd.read_parquet("data/cleaned/doctors.parquet")
+        branches = pd.read_parquet("data/cleaned/branches.parquet")
+        diseases = pd.read_parquet("data/cleaned/diseases.parquet")
+        appointments = pd.read_parquet("data/cleaned/appointments.parquet", columns=KB_PATIENT_COLUMNS)
+        
+        kb_gen.generate_from_data(doctors, branches, diseases, appointments)
+        print("Knowledge Base built successfully!")
+    except Exception as e:
+        # Don't stop the dashboard, the AI assistant falls back without a KB
+        print(f"Could not build Knowledge Base: {e}")
+
+@st.cache_resource
+def start_kb_build():
+    """Build the Knowledge Base in a background thread if it is missing (once per process)"""
+    if os.path.exists(KB_PATH):
+        return None
+    thread = threading.Thread(target=_build_kb, name="kb-build", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_data
+def per_branch(branch):
+    """Appointments for one branch ("All" returns everything); keyed only on the branch string"""
+    data = _load_df()
+    if data is None or branch == "All":
+        return data
+    data = data[data['branch_name'] == branch]
+    # Drop categories that no longer occur so counts/crosstabs skip zero rows
+    cat_cols = data.select_dtypes(include=['category']).columns
+    return data.assign(**{col: data[col].cat.remove_unused_categories() for col in cat_cols})
+
+@st.cache_data
+def aggregates_for_branch(branch):
+    """Precompute every count the tabs render, once per branch"""
+    data = per_branch(branch)
+    
+    # One value_counts per categorical column (hash-agg over integer codes)
+    counts = {
+        col: data[col].value_counts()
+        for col in ['disease_name', 'doctor_name', 'area', 'branch_name', 'gender']
+        if col in data.columns
+    }
+    aggregates = {
+        'total': len(data),
+        'counts': counts,
+        'unique_counts': {
+            col: int((counts[col] > 0).sum()) if col in counts else 0
+            for col in ['doctor_name', 'disease_name', 'area']
+        },
+        'daily_counts': None,
+    }
+    
+    # visit_timestamp is already datetime64 in the Parquet file: no copy or to_datetime needed
+    timestamps = data['visit_timestamp'].dropna() if 'visit_timestamp' in data.columns else None
+    if timestamps is not None and len(timestamps) > 0:
+        daily_counts = (
+            timestamps.dt.floor('D')
+            .value_counts()
+            .sort_index()
+            .asfreq('D', fill_value=0)  # keep zero-visit days like resample did
+            .rename_axis('Date')
+            .reset_index(name='Visits')
+        )
+        aggregates['daily_counts'] = daily_counts
+    
+    if 'disease_name' in counts:
+        disease_counts = counts['disease_name'].reset_index()
+        disease_counts.columns = ['Disease', 'Count']
+        disease_counts['Disease'] = disease_counts['Disease'].astype(str)
+        
+        # Only the top 20 are plotted; cumulative % is still relative to all cases
+        top = disease_counts.head(20).copy()
+        top['Cumulative Percentage'] = top['Count'].cumsum() / disease_counts['Count'].sum() * 100
+        aggregates['disease_top'] = top
+        
+        # Treemap: top 20 leaves plus one "Other" leaf for the tail
+        other = disease_counts['Count'].iloc[20:].sum()
+        tree_df = top
+        if other > 0:
+            tree_df = pd.concat(
+                [top, pd.DataFrame([['Other', other, 100.0]], columns=top.columns)],
+                ignore_index=True
+            )
+        aggregates['disease_tree'] = tree_df
+    
+    return aggregates
+
+@st.cache_data
+def crosstab_for_branch(branch, y_axis, x_axis, max_size=50):
+    """Cross-tabulation for the heatmap, capped to the max_size busiest rows/columns"""
+    data = per_branch(branch)
+    crosstab = pd.crosstab(data[y_axis], data[x_axis])
+    return crosstab.loc[
+        crosstab.sum(axis=1).nlargest(max_size).index,
+        crosstab.sum(axis=0).nlargest(max_size).index
+    ]
+
+@st.cache_resource
+def get_llm():
+    """Single LLMGenerator shared across reruns and sessions"""
+    from src.llm import LLMGenerator
+    return LLMGenerator()
+
+@st.cache_resource
+def get_kb():
+    """Single JSONKnowledgeBase shared across reruns and sessions"""
+    from src.json_kb import JSONKnowledgeBase
+    return JSONKnowledgeBase()
+
+@st.cache_data(ttl=3600)
+def get_context():
+    """Full KB context text for the LLM prompt"""
+    return get_kb().get_full_context()
+
+df = _load_df()
+kb_thread = start_kb_build() if df is not None else None
 
 # Sidebar with enhanced styling
 st.sidebar.markdown("### Control Panel")
 if st.sidebar.button("Rebuild Knowledge Base"):
     try:
-        os.remove("data/knowledge_base/analytics_kb.json")
+        for path in (KB_PATH, KB_PATH + ".gz"):
+            if os.path.exists(path):
+                os.remove(path)
         st.cache_data.clear()
+        st.cache_resource.clear()
         st.rerun()
     except:
         pass
@@ -274,10 +225,11 @@ if df is not None and len(df) > 0:
     st.sidebar.metric("Total Records", len(df))
     st.sidebar.metric("Branches", df['branch_name'].nunique() if 'branch_name' in df.columns else 0)
     
-    if branch_filter != "All":
-        df = df[df['branch_name'] == branch_filter]
+    # Views below come from the cached per-branch aggregates; df stays the
+    # shared cache_resource frame (no per-rerun copy of the filtered data)
+    aggregates = aggregates_for_branch(branch_filter)
     
-    if len(df) == 0:
+    if aggregates['total'] == 0:
         st.warning(f"No data available for branch {branch_filter}. Please select a different branch.")
     else:
         # Summary Metrics with enhanced styling
@@ -287,32 +239,29 @@ if df is not None and len(df) > 0:
         with metric_col1:
             st.metric(
                 "Total Patients",
-                f"{len(df):,}",
+                f"{aggregates['total']:,}",
                 delta=None,
                 help="Total number of patient visits"
             )
         
         with metric_col2:
-            unique_doctors = df['doctor_name'].nunique() if 'doctor_name' in df.columns else 0
             st.metric(
                 "Active Doctors",
-                unique_doctors,
+                aggregates['unique_counts']['doctor_name'],
                 help="Number of doctors serving patients"
             )
         
         with metric_col3:
-            unique_diseases = df['disease_name'].nunique() if 'disease_name' in df.columns else 0
             st.metric(
                 "Disease Types",
-                unique_diseases,
+                aggregates['unique_counts']['disease_name'],
                 help="Unique diseases being treated"
             )
         
         with metric_col4:
-            unique_areas = df['area'].nunique() if 'area' in df.columns else 0
             st.metric(
                 "Areas Served",
-                unique_areas,
+                aggregates['unique_counts']['area'],
                 help="Geographic coverage"
             )
         
@@ -326,81 +275,74 @@ if df is not None and len(df) > 0:
             st.markdown("### Temporal & Demographics Analysis")
             
             # Row 1: Time Series
-            if 'visit_timestamp' in df.columns and len(df) > 0:
-                df_copy = df.copy()
-                df_copy['visit_timestamp'] = pd.to_datetime(df_copy['visit_timestamp'], errors='coerce')
-                df_copy = df_copy.dropna(subset=['visit_timestamp'])
-                
-                if len(df_copy) > 0:
-                    daily_counts = df_copy.set_index('visit_timestamp').resample('D').size().reset_index()
-                    daily_counts.columns = ['Date', 'Visits']
-                    
-                    fig_trend = px.line(
-                        daily_counts, x='Date', y='Visits', markers=True,
-                        title="Daily Patient Visits Trend",
-                        color_discrete_sequence=['#4F9FFD']
-                    )
-                    fig_trend.update_layout(
-                        height=400, plot_bgcolor='#14344F', paper_bgcolor='#14344F',
-                        font=dict(color='#E0E7FF'),
-                        xaxis=dict(gridcolor='rgba(224, 231, 255, 0.1)'),
-                        yaxis=dict(gridcolor='rgba(224, 231, 255, 0.1)')
-                    )
-                    st.plotly_chart(fig_trend, use_container_width=True)
+            daily_counts = aggregates['daily_counts']
+            if daily_counts is not None:
+                # WebGL trace; per-day markers only while the series is short
+                fig_trend = go.Figure(go.Scattergl(
+                    x=daily_counts['Date'],
+                    y=daily_counts['Visits'].astype('int32'),
+                    mode='lines' if len(daily_counts) > 500 else 'lines+markers',
+                    line=dict(color='#4F9FFD'),
+                    name='Visits'
+                ))
+                fig_trend.update_layout(
+                    title="Daily Patient Visits Trend",
+                    height=400, plot_bgcolor='#14344F', paper_bgcolor='#14344F',
+                    font=dict(color='#E0E7FF'),
+                    xaxis=dict(title='Date', gridcolor='rgba(224, 231, 255, 0.1)'),
+                    yaxis=dict(title='Visits', gridcolor='rgba(224, 231, 255, 0.1)')
+                )
+                st.plotly_chart(fig_trend, use_container_width=True)
             
             # Row 2: Pie Charts (Gender & Branch)
             col_p1, col_p2 = st.columns(2)
             
             with col_p1:
-                if 'gender' in df.columns:
-                    gender_counts = df['gender'].value_counts()
-                    fig_gender = px.pie(
-                        values=gender_counts.values, names=gender_counts.index,
-                        title="Patient Gender Distribution",
-                        color_discrete_sequence=px.colors.qualitative.Pastel,
+                if 'gender' in aggregates['counts']:
+                    gender_counts = aggregates['counts']['gender']
+                    fig_gender = go.Figure(go.Pie(
+                        labels=gender_counts.index.astype(str).tolist(),
+                        values=gender_counts.values.tolist(),
+                        marker=dict(colors=px.colors.qualitative.Pastel),
                         hole=0.4
-                    )
-                    fig_gender.update_layout(paper_bgcolor='#14344F', font=dict(color='#E0E7FF'))
+                    ))
+                    fig_gender.update_layout(title="Patient Gender Distribution", paper_bgcolor='#14344F', font=dict(color='#E0E7FF'))
                     st.plotly_chart(fig_gender, use_container_width=True)
             
             with col_p2:
-                if 'branch_name' in df.columns:
-                    branch_counts = df['branch_name'].value_counts()
-                    fig_branch = px.pie(
-                        values=branch_counts.values, names=branch_counts.index,
-                        title="Patient Distribution by Branch",
-                        color_discrete_sequence=px.colors.qualitative.Safe,
+                if 'branch_name' in aggregates['counts']:
+                    branch_counts = aggregates['counts']['branch_name']
+                    fig_branch = go.Figure(go.Pie(
+                        labels=branch_counts.index.astype(str).tolist(),
+                        values=branch_counts.values.tolist(),
+                        marker=dict(colors=px.colors.qualitative.Safe),
                         hole=0.4
-                    )
-                    fig_branch.update_layout(paper_bgcolor='#14344F', font=dict(color='#E0E7FF'))
+                    ))
+                    fig_branch.update_layout(title="Patient Distribution by Branch", paper_bgcolor='#14344F', font=dict(color='#E0E7FF'))
                     st.plotly_chart(fig_branch, use_container_width=True)
 
         # --- TAB 2: DISEASE ANALYTICS ---
         with tab2:
             st.markdown("### Disease Prevalence & Pareto Analysis")
             
-            if 'disease_name' in df.columns:
-                disease_counts = df['disease_name'].value_counts().reset_index()
-                disease_counts.columns = ['Disease', 'Count']
-                
-                # Calculate Cumulative Percentage
-                disease_counts['Cumulative Percentage'] = (disease_counts['Count'].cumsum() / disease_counts['Count'].sum()) * 100
+            if 'disease_top' in aggregates:
+                disease_top = aggregates['disease_top']
                 
                 # Pareto Chart (Bar + Line)
                 fig_pareto = go.Figure()
                 
                 # Bar Chart (Counts)
                 fig_pareto.add_trace(go.Bar(
-                    x=disease_counts['Disease'].head(20),
-                    y=disease_counts['Count'].head(20),
+                    x=disease_top['Disease'],
+                    y=disease_top['Count'],
                     name='Cases',
                     marker_color='#4F9FFD'
                 ))
                 
                 # Line Chart (Cumulative %)
                 fig_pareto.add_trace(go.Scatter(
-                    x=disease_counts['Disease'].head(20),
-                    y=disease_counts['Cumulative Percentage'].head(20),
+                    x=disease_top['Disease'],
+                    y=disease_top['Cumulative Percentage'],
                     name='Cumulative %',
                     yaxis='y2',
                     mode='lines+markers',
@@ -422,7 +364,7 @@ if df is not None and len(df) > 0:
                 # Treemap with enhanced visuals
                 st.markdown("### Disease Hierarchy (Treemap)")
                 fig_tree = px.treemap(
-                    disease_counts, 
+                    aggregates['disease_tree'], 
                     path=['Disease'], 
                     values='Count',
                     color='Count', 
@@ -450,27 +392,36 @@ if df is not None and len(df) > 0:
             col_d1, col_d2 = st.columns(2)
             
             with col_d1:
-                if 'doctor_name' in df.columns:
-                    top_doctors = df['doctor_name'].value_counts().head(10)
-                    fig_doc = px.bar(
-                        x=top_doctors.values, y=top_doctors.index, orientation='h',
+                if 'doctor_name' in aggregates['counts']:
+                    top_doctors = aggregates['counts']['doctor_name'].head(10)
+                    fig_doc = go.Figure(go.Bar(
+                        x=top_doctors.values.tolist(),
+                        y=top_doctors.index.astype(str).tolist(),
+                        orientation='h',
+                        marker=dict(color=top_doctors.values.tolist(), colorscale='Plasma', showscale=True)
+                    ))
+                    fig_doc.update_layout(
                         title="Top 10 Busiest Doctors",
-                        labels={'x': 'Patients', 'y': 'Doctor'},
-                        color=top_doctors.values, color_continuous_scale='Plasma'
+                        xaxis=dict(title='Patients'),
+                        yaxis=dict(title='Doctor'),
+                        plot_bgcolor='#14344F', paper_bgcolor='#14344F', font=dict(color='#E0E7FF')
                     )
-                    fig_doc.update_layout(plot_bgcolor='#14344F', paper_bgcolor='#14344F', font=dict(color='#E0E7FF'))
                     st.plotly_chart(fig_doc, use_container_width=True)
             
             with col_d2:
-                if 'area' in df.columns:
-                    top_areas = df['area'].value_counts().head(10)
-                    fig_area = px.bar(
-                        x=top_areas.index, y=top_areas.values,
+                if 'area' in aggregates['counts']:
+                    top_areas = aggregates['counts']['area'].head(10)
+                    fig_area = go.Figure(go.Bar(
+                        x=top_areas.index.astype(str).tolist(),
+                        y=top_areas.values.tolist(),
+                        marker=dict(color=top_areas.values.tolist(), colorscale='Turbo', showscale=True)
+                    ))
+                    fig_area.update_layout(
                         title="Top 10 Patient Areas",
-                        labels={'x': 'Area', 'y': 'Patients'},
-                        color=top_areas.values, color_continuous_scale='Turbo'
+                        xaxis=dict(title='Area'),
+                        yaxis=dict(title='Patients'),
+                        plot_bgcolor='#14344F', paper_bgcolor='#14344F', font=dict(color='#E0E7FF')
                     )
-                    fig_area.update_layout(plot_bgcolor='#14344F', paper_bgcolor='#14344F', font=dict(color='#E0E7FF'))
                     st.plotly_chart(fig_area, use_container_width=True)
 
         # --- TAB 4: ADVANCED CORRELATIONS ---
@@ -484,27 +435,28 @@ if df is not None and len(df) > 0:
                 y_axis = st.selectbox("Select Y-Axis Variable", ['disease_name', 'doctor_name', 'gender'], index=0)
             
             if x_axis in df.columns and y_axis in df.columns:
-                # Create Cross-tabulation
-                crosstab = pd.crosstab(df[y_axis], df[x_axis])
+                # Create Cross-tabulation (top 50 x 50 by marginal count)
+                crosstab = crosstab_for_branch(branch_filter, y_axis, x_axis)
                 
-                # Enhanced Heatmap with text values and better sizing
-                fig_corr = px.imshow(
-                    crosstab,
-                    labels=dict(x=x_axis, y=y_axis, color="Count"),
-                    x=crosstab.columns,
-                    y=crosstab.index,
-                    color_continuous_scale='Viridis',
-                    title=f"Heatmap: {y_axis} vs {x_axis}",
-                    text_auto=True,
-                    aspect="auto"
-                )
+                # Heatmap trace; cell labels only while the matrix is small
+                show_text = crosstab.size <= 400
+                fig_corr = go.Figure(go.Heatmap(
+                    z=crosstab.values,
+                    x=crosstab.columns.astype(str),
+                    y=crosstab.index.astype(str),
+                    colorscale='Viridis',
+                    colorbar=dict(title="Count"),
+                    zsmooth=False,
+                    texttemplate="%{z}" if show_text else None
+                ))
                 fig_corr.update_layout(
+                    title=f"Heatmap: {y_axis} vs {x_axis}",
                     height=800,
                     plot_bgcolor='#14344F', 
                     paper_bgcolor='#14344F',
                     font=dict(color='#E0E7FF', size=12),
-                    xaxis=dict(tickangle=-45, side='bottom', title_font=dict(size=14)),
-                    yaxis=dict(side='left', title_font=dict(size=14)),
+                    xaxis=dict(title=x_axis, tickangle=-45, side='bottom', title_font=dict(size=14)),
+                    yaxis=dict(title=y_axis, side='left', autorange='reversed', title_font=dict(size=14)),
                     margin=dict(t=60, l=50, r=50, b=100)
                 )
                 st.plotly_chart(fig_corr, use_container_width=True)
@@ -529,18 +481,17 @@ if df is not None and len(df) > 0:
         st.markdown("<br>", unsafe_allow_html=True)
         ask_button = st.button("Ask AI", type="primary", use_container_width=True)
     
-    if ask_button and query:
+    if ask_button and query and kb_thread is not None and kb_thread.is_alive():
+        st.info("The AI Knowledge Base is still being built. Please ask again in a few seconds.")
+    
+    elif ask_button and query:
         with st.spinner("Thinking..."):
             try:
-                # Initialize LLM and KB directly (Lazy initialization to save resources)
-                from src.llm import LLMGenerator
-                from src.json_kb import JSONKnowledgeBase
-                
-                llm_gen = LLMGenerator()
-                kb = JSONKnowledgeBase()
+                # Shared LLM/KB instances (created lazily on the first question)
+                llm_gen = get_llm()
 
                 # Get full context from KB
-                context_text = kb.get_full_context()
+                context_text = get_context()
                 
                 # Generate answer using LLM Generator directly
                 # This handles API calls and fallbacks internally
@@ -575,7 +526,9 @@ else:
     if st.button("Run Data Pipeline Manually"):
         with st.spinner("Running pipeline..."):
             try:
-                clean_data_main()
+                clean_data_main(force=True)
+                st.cache_resource.clear()
+                st.cache_data.clear()
                 st.success("Pipeline finished! Please refresh the page.")
                 st.rerun()
             except Exception as e:
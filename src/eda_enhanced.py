@@ -1,13 +1,20 @@
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # headless: only PNG output, no GUI backend
 import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import logging
+import hashlib
+import re
+import shutil
+from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
-# Set beautiful style
-sns.set_style("whitegrid")
-sns.set_palette("husl")
+# Set beautiful style (matplotlib's bundled seaborn style, no seaborn import)
+plt.style.use('seaborn-v0_8-whitegrid')
 plt.rcParams['figure.figsize'] = (14, 8)
 plt.rcParams['font.size'] = 11
 plt.rcParams['axes.titlesize'] = 14
@@ -17,6 +24,18 @@ plt.rcParams['axes.labelsize'] = 12
 CLEANED_DIR = "data/cleaned"
 OUTPUT_DIR = "data/eda_output"
 
+# Progress output goes through logging; EDA_VERBOSE=0 keeps only warnings
+log = logging.getLogger(__name__)
+LOG_LEVEL = logging.WARNING if os.getenv("EDA_VERBOSE", "1") == "0" else logging.INFO
+
+def setup_logging():
+    """Plain message-only logging at LOG_LEVEL (also used as the worker initializer)"""
+    logging.basicConfig(level=LOG_LEVEL, format="%(message)s")
+
+def _section(title, width=70):
+    """Log a section banner"""
+    log.info("\n%s\n%s\n%s", "=" * width, title, "=" * width)
+
 # Beautiful color palettes
 COLORS = {
     'primary': ['#667eea', '#764ba2', '#f093fb', '#4facfe'],
@@ -25,42 +44,113 @@ COLORS = {
     'area': ['#4facfe', '#00f2fe', '#43e97b', '#38f9d7'],
     'gradient': ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#00f2fe']
 }
+plt.rcParams['axes.prop_cycle'] = plt.cycler(color=COLORS['gradient'])
+
+@lru_cache(maxsize=None)
+def palette(cmap_name, start, stop, n):
+    """Colormap samples for n bars, computed once per (colormap, range, n)"""
+    return plt.get_cmap(cmap_name)(np.linspace(start, stop, n))
 
 def create_output_dir():
     """Create output directory for visualizations"""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    print(f"Output directory: {OUTPUT_DIR}")
+    log.info("Output directory: %s", OUTPUT_DIR)
+
+# Columns the analyzers actually reference; the entity tables are only counted
+APPOINTMENT_COLUMNS = ['disease_name', 'doctor_name', 'area', 'branch_name', 'visit_timestamp']
+
+# Rendered outputs; reused from EDA_CACHE_DIR while the cleaned inputs are unchanged
+EDA_CACHE_DIR = "data/.eda_cache"
+EDA_CACHE_VERSION = 1  # bump to invalidate cached outputs by hand
+GENERATED_LINE_RE = re.compile(r"^Generated: .*$", re.MULTILINE)
+CACHE_INPUTS = ["doctors.parquet", "branches.parquet", "diseases.parquet", "appointments.parquet"]
+CACHED_OUTPUTS = [
+    os.path.join(OUTPUT_DIR, 'disease_trends_enhanced.png'),
+    os.path.join(OUTPUT_DIR, 'doctor_workload_enhanced.png'),
+    os.path.join(OUTPUT_DIR, 'geographic_distribution_enhanced.png'),
+    os.path.join(OUTPUT_DIR, 'eda_enhanced_summary.txt'),
+    "data/knowledge_base/analytics_insights.md",
+]
+
+def _cache_key():
+    """sha1 over the cache version, this script's source and (name, mtime, size) of the cleaned inputs"""
+    h = hashlib.sha1(f"v{EDA_CACHE_VERSION};".encode())
+    # Plotting/report code changes invalidate the cache as well as data changes
+    h.update(Path(__file__).read_bytes())
+    for name in CACHE_INPUTS:
+        st = os.stat(os.path.join(CLEANED_DIR, name))
+        h.update(f"{name}:{st.st_mtime_ns}:{st.st_size};".encode())
+    return h.hexdigest()
+
+def restore_cached_outputs(key):
+    """Copy cached outputs for key into place; False if any are missing"""
+    cache_dir = os.path.join(EDA_CACHE_DIR, key)
+    cached = [os.path.join(cache_dir, os.path.basename(p)) for p in CACHED_OUTPUTS]
+    if not all(os.path.exists(p) for p in cached):
+        return False
+    for src, dst in zip(cached, CACHED_OUTPUTS):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(src, dst)
+    # The restored summary should report this run, not the one that was cached
+    summary = Path(OUTPUT_DIR, 'eda_enhanced_summary.txt')
+    summary.write_text(
+        GENERATED_LINE_RE.sub(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                              summary.read_text(encoding="utf-8")),
+        encoding="utf-8"
+    )
+    return True
+
+def store_cached_outputs(key):
+    """Snapshot the freshly written outputs under EDA_CACHE_DIR/key; older keys are removed"""
+    cache_dir = os.path.join(EDA_CACHE_DIR, key)
+    os.makedirs(cache_dir, exist_ok=True)
+    for path in CACHED_OUTPUTS:
+        shutil.copy2(path, os.path.join(cache_dir, os.path.basename(path)))
+    for entry in os.scandir(EDA_CACHE_DIR):
+        if entry.is_dir() and entry.name != key:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def _load(name, columns=None):
+    """Read one cleaned Parquet table (memory-mapped, category columns kept as category)"""
+    return pd.read_parquet(os.path.join(CLEANED_DIR, name), columns=columns, engine="pyarrow", memory_map=True)
 
 def load_data():
     """Load all cleaned data"""
-    print("\n" + "="*70)
-    print("LOADING DATA")
-    print("="*70)
+    _section("LOADING DATA")
+    
+    doctors = _load("doctors.parquet", columns=['doctor_id'])
+    branches = _load("branches.parquet", columns=['branch_id'])
+    diseases = _load("diseases.parquet", columns=['disease_id'])
+    appointments = _load("appointments.parquet", columns=APPOINTMENT_COLUMNS)
     
-    doctors = pd.read_csv(os.path.join(CLEANED_DIR, "doctors.csv"))
-    branches = pd.read_csv(os.path.join(CLEANED_DIR, "branches.csv"))
-    diseases = pd.read_csv(os.path.join(CLEANED_DIR, "diseases.csv"))
-    appointments = pd.read_csv(os.path.join(CLEANED_DIR, "appointments.csv"))
+    # value_counts on category columns is a bincount over integer codes;
+    # a no-op when the Parquet file already carries the category dtype
+    for col in ('disease_name', 'doctor_name', 'area', 'branch_name'):
+        appointments[col] = appointments[col].astype('category')
     
-    print(f"Doctors: {len(doctors)} records")
-    print(f"Branches: {len(branches)} records")
-    print(f"Diseases: {len(diseases)} records")
-    print(f"Appointments: {len(appointments)} records")
+    log.info("Doctors: %d records", len(doctors))
+    log.info("Branches: %d records", len(branches))
+    log.info("Diseases: %d records", len(diseases))
+    log.info("Appointments: %d records", len(appointments))
     
     return doctors, branches, diseases, appointments
 
-def analyze_disease_trends(patients):
+def analyze_disease_trends(disease_counts, total_patients):
     """Analyze and visualize disease trends with beautiful colors"""
-    print("\n" + "="*70)
-    print("DISEASE TRENDS ANALYSIS")
-    print("="*70)
+    _section("DISEASE TRENDS ANALYSIS")
     
-    disease_counts = patients['disease_name'].value_counts()
+    # value_counts is sorted: slice one top-20 view for every chart below
+    top_20 = disease_counts.iloc[:20]
+    total = disease_counts.sum()
+    top_10 = top_20.iloc[:10]
     
-    print(f"\nTotal unique diseases: {len(disease_counts)}")
-    print(f"\nTop 10 diseases:")
-    for disease, count in disease_counts.head(10).items():
-        print(f"  - {disease}: {count} cases ({count/len(patients)*100:.1f}%)")
+    log.info("\nTotal unique diseases: %d", len(disease_counts))
+    if log.isEnabledFor(logging.INFO):
+        log.info("\nTop 10 diseases:\n%s", pd.DataFrame({
+            'disease': top_10.index.astype(str),
+            'cases': top_10.values,
+            'pct': (top_10.values * 100 / total_patients).round(1)
+        }).to_string(index=False))
     
     # Create figure with subplots
     fig = plt.figure(figsize=(18, 10))
@@ -68,8 +158,7 @@ def analyze_disease_trends(patients):
     
     # 1. Horizontal bar chart with gradient
     ax1 = fig.add_subplot(gs[0, :])
-    top_10 = disease_counts.head(10)
-    colors_gradient = plt.cm.viridis(np.linspace(0.3, 0.9, len(top_10)))
+    colors_gradient = palette('viridis', 0.3, 0.9, len(top_10))
     bars = ax1.barh(range(len(top_10)), top_10.values, color=colors_gradient, edgecolor='white', linewidth=2)
     ax1.set_yticks(range(len(top_10)))
     ax1.set_yticklabels(top_10.index, fontsize=11)
@@ -79,21 +168,21 @@ def analyze_disease_trends(patients):
     ax1.grid(axis='x', alpha=0.3, linestyle='--')
     
     # Add value labels
-    for i, (bar, value) in enumerate(zip(bars, top_10.values)):
-        ax1.text(value + 0.5, i, f'{value}', va='center', fontsize=10, fontweight='bold')
+    ax1.bar_label(bars, fmt='%d', fontsize=10, fontweight='bold', padding=3, label_type='edge')
     
     # 2. Pie chart with explosion
     ax2 = fig.add_subplot(gs[1, 0])
-    top_5 = disease_counts.head(5)
-    other = disease_counts[5:].sum()
-    pie_data = pd.concat([top_5, pd.Series({'Other': other})])
+    top_5 = top_20.iloc[:5]
+    other = total - top_5.sum()
+    pie_labels = np.concatenate([top_5.index.astype(str).to_numpy(), ['Other']])
+    pie_values = np.concatenate([top_5.to_numpy(), [other]])
     
     colors_pie = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#00f2fe', '#cccccc']
     explode = [0.05] * 5 + [0]
     
     wedges, texts, autotexts = ax2.pie(
-        pie_data.values,
-        labels=pie_data.index,
+        pie_values,
+        labels=pie_labels,
         autopct='%1.1f%%',
         startangle=90,
         colors=colors_pie,
@@ -110,10 +199,10 @@ def analyze_disease_trends(patients):
     
     # 3. Treemap-style visualization
     ax3 = fig.add_subplot(gs[1, 1])
-    top_15 = disease_counts.head(15)
+    top_15 = top_20.iloc[:15]
     
     # Create a simple treemap effect with bars
-    colors_treemap = plt.cm.plasma(np.linspace(0.2, 0.9, len(top_15)))
+    colors_treemap = palette('plasma', 0.2, 0.9, len(top_15))
     bars = ax3.bar(range(len(top_15)), top_15.values, color=colors_treemap, edgecolor='white', linewidth=1.5)
     ax3.set_xticks(range(len(top_15)))
     ax3.set_xticklabels(top_15.index, rotation=45, ha='right', fontsize=9)
@@ -122,26 +211,28 @@ def analyze_disease_trends(patients):
     ax3.grid(axis='y', alpha=0.3, linestyle='--')
     
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'disease_trends_enhanced.png'), dpi=300, bbox_inches='tight', facecolor='white')
-    print(f"\nSaved: disease_trends_enhanced.png")
-    plt.close()
+    plt.savefig(os.path.join(OUTPUT_DIR, 'disease_trends_enhanced.png'), dpi=150, bbox_inches='tight', facecolor='white')
+    log.info("\nSaved: disease_trends_enhanced.png")
+    plt.close(fig)
 
-def analyze_doctor_workload(patients, doctors):
+def analyze_doctor_workload(workload):
     """Analyze doctor workload with stunning visualizations"""
-    print("\n" + "="*70)
-    print("DOCTOR WORKLOAD ANALYSIS")
-    print("="*70)
+    _section("DOCTOR WORKLOAD ANALYSIS")
     
-    # Use doctor_name directly from appointments
-    workload = patients['doctor_name'].value_counts()
+    # Quartiles from one partition pass; reused by the histogram and stats box
+    q1, med, q3 = np.quantile(workload.to_numpy(), [0.25, 0.5, 0.75])
     
-    print(f"\nAverage patients per doctor: {workload.mean():.1f}")
-    print(f"Max workload: {workload.max()} patients")
-    print(f"Min workload: {workload.min()} patients")
+    log.info("\nAverage patients per doctor: %.1f", workload.mean())
+    log.info("Max workload: %d patients", workload.max())
+    log.info("Min workload: %d patients", workload.min())
     
-    print(f"\nTop 10 busiest doctors:")
-    for doctor, count in workload.head(10).items():
-        print(f"  - {doctor}: {count} patients")
+    top_10 = workload.iloc[:10]
+    
+    if log.isEnabledFor(logging.INFO):
+        log.info("\nTop 10 busiest doctors:\n%s", pd.DataFrame({
+            'doctor': top_10.index.astype(str),
+            'patients': top_10.values
+        }).to_string(index=False))
     
     # Create beautiful visualization
     fig, axes = plt.subplots(2, 2, figsize=(18, 12))
@@ -149,8 +240,7 @@ def analyze_doctor_workload(patients, doctors):
     
     # 1. Top 10 doctors - gradient bars
     ax1 = axes[0, 0]
-    top_10 = workload.head(10)
-    colors_gradient = plt.cm.coolwarm(np.linspace(0.3, 0.9, len(top_10)))
+    colors_gradient = palette('coolwarm', 0.3, 0.9, len(top_10))
     bars = ax1.bar(range(len(top_10)), top_10.values, color=colors_gradient, edgecolor='black', linewidth=1.5)
     ax1.set_xticks(range(len(top_10)))
     ax1.set_xticklabels(top_10.index, rotation=45, ha='right', fontsize=10)
@@ -159,16 +249,13 @@ def analyze_doctor_workload(patients, doctors):
     ax1.grid(axis='y', alpha=0.3, linestyle='--')
     
     # Add value labels on bars
-    for bar in bars:
-        height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height,
-                f'{int(height)}', ha='center', va='bottom', fontsize=9, fontweight='bold')
+    ax1.bar_label(bars, fmt='%d', fontsize=9, fontweight='bold')
     
     # 2. Distribution histogram with KDE
     ax2 = axes[0, 1]
     ax2.hist(workload, bins=15, color='#667eea', alpha=0.7, edgecolor='black', linewidth=1.5)
     ax2.axvline(workload.mean(), color='#fa709a', linestyle='--', linewidth=3, label=f'Mean: {workload.mean():.1f}')
-    ax2.axvline(workload.median(), color='#30cfd0', linestyle='--', linewidth=3, label=f'Median: {workload.median():.1f}')
+    ax2.axvline(med, color='#30cfd0', linestyle='--', linewidth=3, label=f'Median: {med:.1f}')
     ax2.set_xlabel('Number of Patients', fontsize=12, fontweight='bold')
     ax2.set_ylabel('Number of Doctors', fontsize=12, fontweight='bold')
     ax2.set_title('Patient Load Distribution', fontsize=14, fontweight='bold', pad=15)
@@ -178,8 +265,8 @@ def analyze_doctor_workload(patients, doctors):
     # 3. Cumulative distribution
     ax3 = axes[1, 0]
     sorted_workload = workload.sort_values()
-    cumulative = np.cumsum(sorted_workload.values)
-    cumulative_pct = (cumulative / cumulative[-1]) * 100
+    cumulative_pct = sorted_workload.cumsum().to_numpy(dtype='float64')
+    cumulative_pct *= 100.0 / cumulative_pct[-1]  # scale in place, no temporary array
     
     ax3.plot(range(len(sorted_workload)), cumulative_pct, color='#764ba2', linewidth=3, marker='o', markersize=4)
     ax3.fill_between(range(len(sorted_workload)), cumulative_pct, alpha=0.3, color='#f093fb')
@@ -204,27 +291,28 @@ def analyze_doctor_workload(patients, doctors):
     ax4.set_yticklabels(['All Doctors'])
     
     # Add statistics text
-    stats_text = f"Min: {workload.min()}\nQ1: {workload.quantile(0.25):.1f}\nMedian: {workload.median():.1f}\nQ3: {workload.quantile(0.75):.1f}\nMax: {workload.max()}"
+    stats_text = f"Min: {workload.min()}\nQ1: {q1:.1f}\nMedian: {med:.1f}\nQ3: {q3:.1f}\nMax: {workload.max()}"
     ax4.text(0.02, 0.98, stats_text, transform=ax4.transAxes, fontsize=10,
             verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
     
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'doctor_workload_enhanced.png'), dpi=300, bbox_inches='tight', facecolor='white')
-    print(f"\nSaved: doctor_workload_enhanced.png")
-    plt.close()
+    plt.savefig(os.path.join(OUTPUT_DIR, 'doctor_workload_enhanced.png'), dpi=150, bbox_inches='tight', facecolor='white')
+    log.info("\nSaved: doctor_workload_enhanced.png")
+    plt.close(fig)
 
-def analyze_geographic_distribution(patients, branches):
+def analyze_geographic_distribution(area_counts, branch_counts):
     """Analyze geographic distribution with beautiful maps"""
-    print("\n" + "="*70)
-    print("GEOGRAPHIC DISTRIBUTION ANALYSIS")
-    print("="*70)
+    _section("GEOGRAPHIC DISTRIBUTION ANALYSIS")
     
-    area_counts = patients['area'].value_counts()
+    log.info("\nTotal areas served: %d", len(area_counts))
+    all_areas = area_counts.iloc[:20]
+    top_10_areas = all_areas.iloc[:10]
     
-    print(f"\nTotal areas served: {len(area_counts)}")
-    print(f"\nTop 10 areas by patient volume:")
-    for area, count in area_counts.head(10).items():
-        print(f"  - {area}: {count} patients")
+    if log.isEnabledFor(logging.INFO):
+        log.info("\nTop 10 areas by patient volume:\n%s", pd.DataFrame({
+            'area': top_10_areas.index.astype(str),
+            'patients': top_10_areas.values
+        }).to_string(index=False))
     
     # Create visualization
     fig = plt.figure(figsize=(18, 12))
@@ -234,8 +322,7 @@ def analyze_geographic_distribution(patients, branches):
     
     # 1. Top areas - horizontal bars with gradient
     ax1 = fig.add_subplot(gs[0, 0])
-    top_10_areas = area_counts.head(10)
-    colors_gradient = plt.cm.turbo(np.linspace(0.1, 0.9, len(top_10_areas)))
+    colors_gradient = palette('turbo', 0.1, 0.9, len(top_10_areas))
     bars = ax1.barh(range(len(top_10_areas)), top_10_areas.values, color=colors_gradient, edgecolor='white', linewidth=2)
     ax1.set_yticks(range(len(top_10_areas)))
     ax1.set_yticklabels(top_10_areas.index, fontsize=11)
@@ -245,14 +332,10 @@ def analyze_geographic_distribution(patients, branches):
     ax1.grid(axis='x', alpha=0.3, linestyle='--')
     
     # Add value labels
-    for i, (bar, value) in enumerate(zip(bars, top_10_areas.values)):
-        ax1.text(value + 0.5, i, f'{value}', va='center', fontsize=10, fontweight='bold')
+    ax1.bar_label(bars, fmt='%d', fontsize=10, fontweight='bold', padding=3, label_type='edge')
     
     # 2. Branch distribution - pie chart
     ax2 = fig.add_subplot(gs[0, 1])
-    # Use branch_name directly from appointments
-    branch_counts = patients['branch_name'].value_counts()
-    
     colors_pie = ['#667eea', '#764ba2', '#f093fb', '#4facfe', '#00f2fe']
     explode = [0.05] * min(len(branch_counts), 5)
     
@@ -275,8 +358,7 @@ def analyze_geographic_distribution(patients, branches):
     
     # 3. All areas - vertical bars
     ax3 = fig.add_subplot(gs[1, :])
-    all_areas = area_counts.head(20)
-    colors_all = plt.cm.rainbow(np.linspace(0, 1, len(all_areas)))
+    colors_all = palette('rainbow', 0, 1, len(all_areas))
     bars = ax3.bar(range(len(all_areas)), all_areas.values, color=colors_all, edgecolor='black', linewidth=1)
     ax3.set_xticks(range(len(all_areas)))
     ax3.set_xticklabels(all_areas.index, rotation=45, ha='right', fontsize=10)
@@ -285,15 +367,13 @@ def analyze_geographic_distribution(patients, branches):
     ax3.grid(axis='y', alpha=0.3, linestyle='--')
     
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, 'geographic_distribution_enhanced.png'), dpi=300, bbox_inches='tight', facecolor='white')
-    print(f"\nSaved: geographic_distribution_enhanced.png")
-    plt.close()
+    plt.savefig(os.path.join(OUTPUT_DIR, 'geographic_distribution_enhanced.png'), dpi=150, bbox_inches='tight', facecolor='white')
+    log.info("\nSaved: geographic_distribution_enhanced.png")
+    plt.close(fig)
 
-def generate_summary_report(doctors, branches, diseases, patients):
+def generate_summary_report(doctors, branches, diseases, patients, counts):
     """Generate enhanced summary report"""
-    print("\n" + "="*70)
-    print("GENERATING ENHANCED SUMMARY REPORT")
-    print("="*70)
+    _section("GENERATING ENHANCED SUMMARY REPORT")
     
     report = []
     report.append("="*80)
@@ -313,17 +393,17 @@ def generate_summary_report(doctors, branches, diseases, patients):
     report.append("-"*80)
     
     # Disease stats
-    disease_counts = patients['disease_name'].value_counts()
+    disease_counts = counts['disease']
     report.append(f"\nMost common disease: {disease_counts.index[0]} ({disease_counts.iloc[0]} cases)")
     report.append(f"Unique diseases treated: {len(disease_counts)}")
     
     # Doctor stats
-    workload = patients['doctor_name'].value_counts()
+    workload = counts['doctor']
     report.append(f"\nAverage patients per doctor: {workload.mean():.1f}")
     report.append(f"Busiest doctor: {workload.index[0]} ({workload.iloc[0]} patients)")
     
     # Geographic stats
-    area_counts = patients['area'].value_counts()
+    area_counts = counts['area']
     report.append(f"\nAreas served: {len(area_counts)}")
     report.append(f"Most served area: {area_counts.index[0]} ({area_counts.iloc[0]} patients)")
     
@@ -344,120 +424,138 @@ def generate_summary_report(doctors, branches, diseases, patients):
     with open(report_path, 'w', encoding='utf-8') as f:
         f.write(report_text)
     
-    print(report_text)
-    print(f"\nSaved: eda_enhanced_summary.txt")
+    log.info("%s", report_text)
+    log.info("\nSaved: eda_enhanced_summary.txt")
 
-def generate_kb_insights(doctors, branches, diseases, patients):
+def generate_kb_insights(patients, counts):
     """Generate detailed analytics insights for the Knowledge Base"""
-    print("\n" + "="*70)
-    print("GENERATING KNOWLEDGE BASE INSIGHTS")
-    print("="*70)
+    _section("GENERATING KNOWLEDGE BASE INSIGHTS")
     
     kb_dir = "data/knowledge_base"
     os.makedirs(kb_dir, exist_ok=True)
     kb_path = os.path.join(kb_dir, "analytics_insights.md")
     
-    with open(kb_path, "w", encoding="utf-8") as f:
-        f.write("# Analytics Insights & Graph Explanations\n\n")
-        f.write("This document contains interpretations of the analytics visualizations generated by the system. Use this to explain graphs and trends to the admin.\n\n")
-        
-        # 1. Disease Trends
-        disease_counts = patients['disease_name'].value_counts()
-        top_disease = disease_counts.index[0]
-        top_count = disease_counts.iloc[0]
-        
-        f.write("## Disease Trends Analysis\n")
-        f.write("### Overview\n")
-        f.write(f"The disease trends analysis reveals that **{top_disease}** is the most prevalent condition, affecting {top_count} patients. ")
-        f.write(f"In total, {len(disease_counts)} unique diseases were recorded.\n\n")
-        
-        f.write("### Top 10 Diseases Graph Interpretation\n")
-        f.write("The 'Top 10 Most Common Diseases' bar chart shows the following distribution:\n")
-        for disease, count in disease_counts.head(10).items():
-            f.write(f"- **{disease}**: {count} cases\n")
-        f.write("\nThis indicates a high prevalence of this specific set of diseases. The chart uses a gradient color scheme to highlight the most critical conditions.\n\n")
-        
-        f.write("### Disease Distribution Pie Chart\n")
-        f.write("The pie chart illustrates the proportion of the top 5 diseases compared to all others. ")
-        f.write(f"The top 5 diseases account for a significant portion of the total cases, highlighting the need to focus resources on these specific treatments.\n\n")
+    # Collect the document and write it in one call
+    parts = []
+    parts.append("# Analytics Insights & Graph Explanations\n\n")
+    parts.append("This document contains interpretations of the analytics visualizations generated by the system. Use this to explain graphs and trends to the admin.\n\n")
+    
+    # 1. Disease Trends
+    disease_counts = counts['disease']
+    top_disease = disease_counts.index[0]
+    top_count = disease_counts.iloc[0]
+    
+    parts.append("## Disease Trends Analysis\n")
+    parts.append("### Overview\n")
+    parts.append(f"The disease trends analysis reveals that **{top_disease}** is the most prevalent condition, affecting {top_count} patients. ")
+    parts.append(f"In total, {len(disease_counts)} unique diseases were recorded.\n\n")
+    
+    parts.append("### Top 10 Diseases Graph Interpretation\n")
+    parts.append("The 'Top 10 Most Common Diseases' bar chart shows the following distribution:\n")
+    top_10 = disease_counts.iloc[:10]
+    parts.append("".join(f"- **{disease}**: {count} cases\n" for disease, count in zip(top_10.index.to_numpy(), top_10.values)))
+    parts.append("\nThis indicates a high prevalence of this specific set of diseases. The chart uses a gradient color scheme to highlight the most critical conditions.\n\n")
+    
+    parts.append("### Disease Distribution Pie Chart\n")
+    parts.append("The pie chart illustrates the proportion of the top 5 diseases compared to all others. ")
+    parts.append(f"The top 5 diseases account for a significant portion of the total cases, highlighting the need to focus resources on these specific treatments.\n\n")
 
-        # 2. Doctor Workload
-        workload = patients['doctor_name'].value_counts()
-        avg_load = workload.mean()
-        busiest_doc_name = workload.index[0]
-        
-        f.write("## Doctor Workload Analysis\n")
-        f.write("### Overview\n")
-        f.write(f"The average workload per doctor is approximately **{avg_load:.1f} patients**. ")
-        f.write(f"The busiest doctor is **{busiest_doc_name}** with {workload.iloc[0]} patients.\n\n")
-        
-        f.write("### Workload Distribution Graph Interpretation\n")
-        f.write("The 'Doctor Workload Analysis' visualizations show a variance in patient distribution. ")
-        f.write("The 'Top 10 Busiest Doctors' chart highlights those with the highest patient volume. ")
-        f.write("The histogram and box plot show the spread of workload across all doctors, indicating whether the load is balanced or skewed.\n\n")
-        
-        # 3. Geographic Distribution
-        area_counts = patients['area'].value_counts()
-        top_area = area_counts.index[0]
-        
-        f.write("## Geographic Distribution Analysis\n")
-        f.write("### Overview\n")
-        f.write(f"Patients come from {len(area_counts)} different areas. ")
-        f.write(f"The area with the highest patient volume is **{top_area}** with {area_counts.iloc[0]} patients.\n\n")
-        
-        f.write("### Geographic Charts Interpretation\n")
-        f.write("The 'Geographic Distribution' charts highlight where the demand is coming from. ")
-        f.write("The 'Top 10 Areas' bar chart identifies the primary catchment areas. ")
-        f.write("The 'Patient Distribution by Branch' pie chart shows how patients are distributed across the different medical centers.\n\n")
-        
-        # 4. Temporal Trends (if available)
-        if 'visit_timestamp' in patients.columns:
-            patients['visit_date'] = pd.to_datetime(patients['visit_timestamp'], errors='coerce')
-            daily_counts = patients.groupby(patients['visit_date'].dt.date).size()
-            if not daily_counts.empty:
-                peak_day = daily_counts.idxmax()
-                peak_count = daily_counts.max()
-                f.write("## Temporal Trends Analysis\n")
-                f.write("### Patient Visits Over Time\n")
-                f.write(f"The 'Patient Visits Over Time' line graph tracks the daily number of visits. ")
-                f.write(f"The peak traffic was recorded on **{peak_day}** with {peak_count} visits. ")
-                f.write("Monitoring these trends helps in staff scheduling and resource allocation.\n\n")
+    # 2. Doctor Workload
+    workload = counts['doctor']
+    avg_load = workload.mean()
+    busiest_doc_name = workload.index[0]
+    
+    parts.append("## Doctor Workload Analysis\n")
+    parts.append("### Overview\n")
+    parts.append(f"The average workload per doctor is approximately **{avg_load:.1f} patients**. ")
+    parts.append(f"The busiest doctor is **{busiest_doc_name}** with {workload.iloc[0]} patients.\n\n")
+    
+    parts.append("### Workload Distribution Graph Interpretation\n")
+    parts.append("The 'Doctor Workload Analysis' visualizations show a variance in patient distribution. ")
+    parts.append("The 'Top 10 Busiest Doctors' chart highlights those with the highest patient volume. ")
+    parts.append("The histogram and box plot show the spread of workload across all doctors, indicating whether the load is balanced or skewed.\n\n")
+    
+    # 3. Geographic Distribution
+    area_counts = counts['area']
+    top_area = area_counts.index[0]
+    
+    parts.append("## Geographic Distribution Analysis\n")
+    parts.append("### Overview\n")
+    parts.append(f"Patients come from {len(area_counts)} different areas. ")
+    parts.append(f"The area with the highest patient volume is **{top_area}** with {area_counts.iloc[0]} patients.\n\n")
+    
+    parts.append("### Geographic Charts Interpretation\n")
+    parts.append("The 'Geographic Distribution' charts highlight where the demand is coming from. ")
+    parts.append("The 'Top 10 Areas' bar chart identifies the primary catchment areas. ")
+    parts.append("The 'Patient Distribution by Branch' pie chart shows how patients are distributed across the different medical centers.\n\n")
+    
+    # 4. Temporal Trends (if available)
+    if 'visit_timestamp' in patients.columns:
+        # Group on datetime64 day buckets (int64 hashing), not object dates
+        visit_date = pd.to_datetime(patients['visit_timestamp'], errors='coerce').dt.floor('D')
+        daily_counts = visit_date.value_counts(sort=False).sort_index()
+        if not daily_counts.empty:
+            peak_day = daily_counts.idxmax().date()
+            peak_count = daily_counts.max()
+            parts.append("## Temporal Trends Analysis\n")
+            parts.append("### Patient Visits Over Time\n")
+            parts.append(f"The 'Patient Visits Over Time' line graph tracks the daily number of visits. ")
+            parts.append(f"The peak traffic was recorded on **{peak_day}** with {peak_count} visits. ")
+            parts.append("Monitoring these trends helps in staff scheduling and resource allocation.\n\n")
 
-    print(f"Saved: {kb_path}")
+    Path(kb_path).write_text("".join(parts), encoding="utf-8")
+    
+    log.info("Saved: %s", kb_path)
 
 def main():
     """Main EDA function"""
-    print("\n" + "="*80)
-    print("SAYLANI MEDICAL HELP DESK - ENHANCED EXPLORATORY DATA ANALYSIS")
-    print("="*80)
+    setup_logging()
+    _section("SAYLANI MEDICAL HELP DESK - ENHANCED EXPLORATORY DATA ANALYSIS", width=80)
     
     create_output_dir()
     
+    key = _cache_key()
+    if restore_cached_outputs(key):
+        log.info("Inputs unchanged; restored outputs from %s", os.path.join(EDA_CACHE_DIR, key))
+        return
+    
     # Load data
     doctors, branches, diseases, patients = load_data()
     
-    # Run analyses with enhanced visualizations
-    analyze_disease_trends(patients)
-    analyze_doctor_workload(patients, doctors)
-    analyze_geographic_distribution(patients, branches)
+    # Count each column once; every analyzer below reuses these
+    counts = {
+        'disease': patients['disease_name'].value_counts(),
+        'doctor': patients['doctor_name'].value_counts(),
+        'area': patients['area'].value_counts(),
+        'branch': patients['branch_name'].value_counts(),
+    }
+    
+    # Run analyses with enhanced visualizations; each one only needs its
+    # counts and writes its own PNG, so the three render on separate cores
+    with ProcessPoolExecutor(max_workers=3, initializer=setup_logging) as executor:
+        futures = [
+            executor.submit(analyze_disease_trends, counts['disease'], len(patients)),
+            executor.submit(analyze_doctor_workload, counts['doctor']),
+            executor.submit(analyze_geographic_distribution, counts['area'], counts['branch']),
+        ]
+        for future in futures:
+            future.result()
     
     # Generate summary
-    generate_summary_report(doctors, branches, diseases, patients)
+    generate_summary_report(doctors, branches, diseases, patients, counts)
     
     # Generate Knowledge Base Insights
-    generate_kb_insights(doctors, branches, diseases, patients)
-    
-    print("\n" + "="*80)
-    print("ENHANCED EDA COMPLETE!")
-    print("="*80)
-    print(f"\nAll outputs saved to: {OUTPUT_DIR}")
-    print("\nGenerated files with beautiful visualizations:")
-    print("  disease_trends_enhanced.png")
-    print("  doctor_workload_enhanced.png")
-    print("  geographic_distribution_enhanced.png")
-    print("  eda_enhanced_summary.txt")
-    print("\nAll charts feature professional color schemes and styling!")
-    print()
+    generate_kb_insights(patients, counts)
+    store_cached_outputs(key)
+    
+    _section("ENHANCED EDA COMPLETE!", width=80)
+    log.info("\nAll outputs saved to: %s", OUTPUT_DIR)
+    log.info("\nGenerated files with beautiful visualizations:\n"
+             "  disease_trends_enhanced.png\n"
+             "  doctor_workload_enhanced.png\n"
+             "  geographic_distribution_enhanced.png\n"
+             "  eda_enhanced_summary.txt")
+    log.info("\nAll charts feature professional color schemes and styling!\n")
 
 if __name__ == "__main__":
     main()
@@ -2,97 +2,203 @@
 JSON Knowledge Base Loader
 Loads and queries structured JSON knowledge base
 """
-import json
 import os
+import re
+import gzip
+from functools import cached_property
+
+import orjson
 from pathlib import Path
 
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Top-level KB key holding the pre-formatted LLM context (written at build time)
+CONTEXT_CACHE_KEY = "_full_context_cache"
+
 class JSONKnowledgeBase:
-    def __init__(self, kb_path="data/knowledge_base/analytics_kb.json"):
+    # search() keywords; plural forms listed explicitly since matching is per word
+    _DISEASE_KWS = frozenset({
+        'disease', 'diseases', 'illness', 'illnesses', 'condition', 'conditions',
+        'common', 'prevalent'
+    })
+    _DOCTOR_KWS = frozenset({
+        'doctor', 'doctors', 'physician', 'physicians', 'workload', 'workloads',
+        'busy', 'busiest', 'staff'
+    })
+    _GEO_KWS = frozenset({
+        'area', 'areas', 'location', 'locations', 'geographic', 'where',
+        'branch', 'branches', 'region', 'regions'
+    })
+    
+    # cached_property section views, reset on every load()
+    _SECTIONS = ('summary', 'disease_trends', 'doctor_workload', 'geographic_distribution')
+    
+    def __init__(self, kb_path="data/knowledge_base/analytics_kb.json", kb_data=None):
         self.kb_path = kb_path
         self.kb_data = None
-        self.load()
+        self._context_cache = None
+        self._search_cache = {}
+        if kb_data is not None:
+            # Wrap in-memory data (used by the generator to pre-format the context)
+            self.kb_data = kb_data
+        else:
+            self.load()
     
     def load(self):
         """Load JSON knowledge base"""
-        if not os.path.exists(self.kb_path):
+        self._context_cache = None
+        self._search_cache = {}
+        # Drop section views cached from the previous data
+        for name in self._SECTIONS:
+            self.__dict__.pop(name, None)
+        gz_path = self.kb_path + ".gz"
+        # The generator writes both files; a .gz older than the JSON (git pull,
+        # hand edit) is stale and must not shadow it
+        if os.path.exists(gz_path) and (
+            not os.path.exists(self.kb_path) or os.path.getmtime(gz_path) >= os.path.getmtime(self.kb_path)
+        ):
+            self.kb_data = orjson.loads(gzip.decompress(Path(gz_path).read_bytes()))
+            source = gz_path
+        elif os.path.exists(self.kb_path):
+            self.kb_data = orjson.loads(Path(self.kb_path).read_bytes())
+            source = self.kb_path
+        else:
             print(f"Knowledge base not found at {self.kb_path}")
             self.kb_data = {}
             return
         
-        with open(self.kb_path, 'r', encoding='utf-8') as f:
-            self.kb_data = json.load(f)
-        
-        print(f"Loaded JSON Knowledge Base: {self.kb_path}")
+        print(f"Loaded JSON Knowledge Base: {source}")
         print(f"   - Generated: {self.kb_data.get('metadata', {}).get('generated_at', 'Unknown')}")
         print(f"   - Total patients: {self.kb_data.get('summary', {}).get('total_patients', 0)}")
     
     def get_full_context(self):
-        """Get full KB as formatted text for LLM context"""
+        """Get full KB as formatted text for LLM context (built once per load)"""
         if not self.kb_data:
             return "Knowledge base is empty or not loaded."
         
-        context = []
-        
-        # Add summary
-        context.append("=== ANALYTICS SUMMARY ===")
-        summary = self.kb_data.get('summary', {})
-        for key, value in summary.items():
+        if self._context_cache is None:
+            # Generated KBs embed the context; older files are formatted in memory
+            # only (the file is never rewritten from the request path)
+            self._context_cache = self.kb_data.get(CONTEXT_CACHE_KEY) or self.build_context()
+        return self._context_cache
+    
+    def build_context(self):
+        """Format the full LLM context from the KB sections"""
+        return "\n\n".join((
+            self.format_summary(),
+            self.format_disease_trends(),
+            self.format_doctor_workload(),
+            self.format_geographic_distribution()
+        ))
+    
+    @cached_property
+    def summary(self):
+        """Executive summary section"""
+        return self.kb_data.get('summary') or {}
+    
+    @cached_property
+    def disease_trends(self):
+        """Disease trends section"""
+        return (self.kb_data.get('analytics') or {}).get('disease_trends') or {}
+    
+    @cached_property
+    def doctor_workload(self):
+        """Doctor workload section"""
+        return (self.kb_data.get('analytics') or {}).get('doctor_workload') or {}
+    
+    @cached_property
+    def geographic_distribution(self):
+        """Geographic distribution section"""
+        return (self.kb_data.get('analytics') or {}).get('geographic_distribution') or {}
+    
+    def format_summary(self):
+        """Format executive summary section"""
+        context = ["=== ANALYTICS SUMMARY ==="]
+        for key, value in self.summary.items():
             if key == 'key_insights':
                 context.append("\nKey Insights:")
-                for insight in value:
-                    context.append(f"  - {insight}")
+                context.extend(f"  - {insight}" for insight in value)
             else:
                 context.append(f"{key.replace('_', ' ').title()}: {value}")
-        
-        # Add disease trends
-        context.append("\n=== DISEASE TRENDS ===")
-        disease_trends = self.kb_data.get('analytics', {}).get('disease_trends', {})
-        context.append(f"Interpretation: {disease_trends.get('interpretation', '')}")
-        context.append("\nTop 10 Diseases:")
-        for disease in disease_trends.get('top_10_diseases', []):
-            context.append(f"  {disease['rank']}. {disease['disease_name']}: {disease['case_count']} cases ({disease['percentage']}%)")
-        
-        # Add doctor workload
-        context.append("\n=== DOCTOR WORKLOAD ===")
-        workload = self.kb_data.get('analytics', {}).get('doctor_workload', {})
-        context.append(f"Interpretation: {workload.get('interpretation', '')}")
-        context.append("\nTop 10 Busiest Doctors:")
-        for doc in workload.get('top_10_busiest_doctors', []):
-            context.append(f"  {doc['rank']}. Dr. {doc['doctor_name']} ({doc['specialty']}): {doc['patient_count']} patients")
-        
-        # Add geographic distribution
-        context.append("\n=== GEOGRAPHIC DISTRIBUTION ===")
-        geo = self.kb_data.get('analytics', {}).get('geographic_distribution', {})
-        context.append(f"Interpretation: {geo.get('interpretation', '')}")
-        context.append("\nTop 10 Areas:")
-        for area in geo.get('top_10_areas', []):
-            context.append(f"  {area['rank']}. {area['area_name']}: {area['patient_count']} patients ({area['percentage']}%)")
-        
+        return "\n".join(context)
+    
+    def format_disease_trends(self):
+        """Format disease trends section"""
+        disease_trends = self.disease_trends
+        context = [
+            "=== DISEASE TRENDS ===",
+            f"Interpretation: {disease_trends.get('interpretation', '')}",
+            "\nTop 10 Diseases:"
+        ]
+        context.extend(
+            f"  {d['rank']}. {d['disease_name']}: {d['case_count']} cases ({d['percentage']}%)"
+            for d in disease_trends.get('top_10_diseases', ())
+        )
+        return "\n".join(context)
+    
+    def format_doctor_workload(self):
+        """Format doctor workload section"""
+        workload = self.doctor_workload
+        context = [
+            "=== DOCTOR WORKLOAD ===",
+            f"Interpretation: {workload.get('interpretation', '')}",
+            "\nTop 10 Busiest Doctors:"
+        ]
+        context.extend(
+            f"  {doc['rank']}. Dr. {doc['doctor_name']} ({doc['specialty']}): {doc['patient_count']} patients"
+            for doc in workload.get('top_10_busiest_doctors', ())
+        )
+        return "\n".join(context)
+    
+    def format_geographic_distribution(self):
+        """Format geographic distribution section"""
+        geo = self.geographic_distribution
+        context = [
+            "=== GEOGRAPHIC DISTRIBUTION ===",
+            f"Interpretation: {geo.get('interpretation', '')}",
+            "\nTop 10 Areas:"
+        ]
+        context.extend(
+            f"  {area['rank']}. {area['area_name']}: {area['patient_count']} patients ({area['percentage']}%)"
+            for area in geo.get('top_10_areas', ())
+        )
         return "\n".join(context)
     
     def query_disease_trends(self):
         """Get disease trends data"""
-        return self.kb_data.get('analytics', {}).get('disease_trends', {})
+        return self.disease_trends
     
     def query_doctor_workload(self):
         """Get doctor workload data"""
-        return self.kb_data.get('analytics', {}).get('doctor_workload', {})
+        return self.doctor_workload
     
     def query_geographic_distribution(self):
         """Get geographic distribution data"""
-        return self.kb_data.get('analytics', {}).get('geographic_distribution', {})
+        return self.geographic_distribution
     
     def query_summary(self):
         """Get executive summary"""
-        return self.kb_data.get('summary', {})
+        return self.summary
     
     def search(self, query_text):
         """Search KB for relevant information based on query keywords"""
-        query_lower = query_text.lower()
+        tokens = frozenset(_WORD_RE.findall(query_text.lower()))
+        match = (
+            bool(self._DISEASE_KWS & tokens),
+            bool(self._DOCTOR_KWS & tokens),
+            bool(self._GEO_KWS & tokens)
+        )
+        # Results only depend on which sections matched; KB data is fixed until load()
+        if match not in self._search_cache:
+            self._search_cache[match] = self._build_search_results(*match)
+        return self._search_cache[match]
+    
+    def _build_search_results(self, disease, doctor, geo):
+        """Assemble the result list for one combination of matched sections"""
         results = []
         
         # Check for disease-related queries
-        if any(word in query_lower for word in ['disease', 'illness', 'condition', 'common', 'prevalent']):
+        if disease:
             disease_data = self.query_disease_trends()
             results.append({
                 "type": "disease_trends",
@@ -101,7 +207,7 @@ class JSONKnowledgeBase:
             })
         
         # Check for doctor-related queries
-        if any(word in query_lower for word in ['doctor', 'physician', 'workload', 'busy', 'staff']):
+        if doctor:
             workload_data = self.query_doctor_workload()
             results.append({
                 "type": "doctor_workload",
@@ -110,7 +216,7 @@ class JSONKnowledgeBase:
             })
         
         # Check for geographic queries
-        if any(word in query_lower for word in ['area', 'location', 'geographic', 'where', 'branch', 'region']):
+        if geo:
             geo_data = self.query_geographic_distribution()
             results.append({
                 "type": "geographic_distribution",
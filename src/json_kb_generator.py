@@ -2,10 +2,23 @@
 JSON-based Knowledge Base Generator
 Converts analytics data into structured JSON knowledge base
 """
-import json
+import gzip
+import orjson
 import pandas as pd
 import os
+import sys
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.json_kb import JSONKnowledgeBase, CONTEXT_CACHE_KEY
+
+# Appointment columns the analytics read; everything else is dropped up front
+KB_PATIENT_COLUMNS = ['disease_name', 'doctor_name', 'area', 'branch_name', 'specialty', 'visit_timestamp']
+KB_CATEGORY_COLUMNS = ['disease_name', 'doctor_name', 'area', 'branch_name', 'specialty']
 
 class JSONKnowledgeBaseGenerator:
     def __init__(self):
@@ -14,6 +27,28 @@ class JSONKnowledgeBaseGenerator:
         
     def generate_from_data(self, doctors_df, branches_df, diseases_df, patients_df):
         """Generate comprehensive JSON knowledge base from analytics data"""
+        patients_df = patients_df[[c for c in KB_PATIENT_COLUMNS if c in patients_df.columns]]
+        # Count and compare on integer codes; a no-op for the cleaned Parquet columns
+        patients_df = patients_df.astype({c: 'category' for c in KB_CATEGORY_COLUMNS if c in patients_df.columns})
+        
+        total = len(patients_df)
+        
+        # The counts and analyzers are independent pandas work that mostly runs
+        # in C with the GIL released, so they share a small thread pool
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            temporal = executor.submit(self._analyze_temporal_patterns, patients_df)
+            
+            # Count each column once; the analyzers and summary share these
+            count_columns = {'disease': 'disease_name', 'doctor': 'doctor_name', 'area': 'area', 'branch': 'branch_name'}
+            counts = dict(zip(count_columns, executor.map(lambda col: patients_df[col].value_counts(), count_columns.values())))
+            
+            futures = {
+                "disease_trends": executor.submit(self._analyze_disease_trends, counts['disease'], total),
+                "doctor_workload": executor.submit(self._analyze_doctor_workload, counts['doctor'], patients_df, doctors_df),
+                "geographic_distribution": executor.submit(self._analyze_geographic_distribution, counts['area'], counts['branch'], total, branches_df),
+                "temporal_patterns": temporal,
+            }
+            analytics = {name: future.result() for name, future in futures.items()}
         
         kb = {
             "metadata": {
@@ -22,79 +57,89 @@ class JSONKnowledgeBaseGenerator:
                 "format": "json",
                 "description": "Saylani Medical Help Desk Analytics Knowledge Base"
             },
-            "analytics": {
-                "disease_trends": self._analyze_disease_trends(patients_df, diseases_df),
-                "doctor_workload": self._analyze_doctor_workload(patients_df, doctors_df),
-                "geographic_distribution": self._analyze_geographic_distribution(patients_df, branches_df),
-                "temporal_patterns": self._analyze_temporal_patterns(patients_df)
-            },
+            "analytics": analytics,
             "entities": {
                 "doctors": self._format_doctors(doctors_df),
                 "branches": self._format_branches(branches_df),
                 "diseases": self._format_diseases(diseases_df)
             },
-            "summary": self._generate_summary(patients_df, doctors_df, branches_df, diseases_df)
+            "summary": self._generate_summary(counts, total, doctors_df, branches_df)
         }
         
-        # Save to JSON file
+        # Pre-format the LLM context once here instead of on every query
+        kb[CONTEXT_CACHE_KEY] = JSONKnowledgeBase(kb_data=kb).build_context()
+        
+        # Save compact JSON plus a gzipped copy (the loader prefers the .gz)
         kb_path = os.path.join(self.kb_dir, "analytics_kb.json")
-        with open(kb_path, 'w', encoding='utf-8') as f:
-            json.dump(kb, f, indent=2, ensure_ascii=False)
+        data = orjson.dumps(kb, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        self._write_atomic(kb_path, data)
+        self._write_atomic(kb_path + ".gz", gzip.compress(data, compresslevel=3))
         
         print(f"JSON Knowledge Base generated: {kb_path}")
         return kb
     
-    def _analyze_disease_trends(self, patients_df, diseases_df):
+    @staticmethod
+    def _write_atomic(path, data):
+        """Write via a temp file and os.replace so readers never see a partial file"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        Path(tmp_path).write_bytes(data)
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def _with_percentages(counts, total):
+        """(label, count, pct) triples as native Python values; pct = count/total*100 rounded to 2"""
+        pcts = (counts.to_numpy() * (100.0 / total)).round(2)
+        return zip(counts.index.tolist(), counts.tolist(), pcts.tolist())
+    
+    def _analyze_disease_trends(self, disease_counts, total_patients):
         """Analyze disease trends and return structured data"""
-        disease_counts = patients_df['disease_name'].value_counts()
+        top = list(self._with_percentages(disease_counts.head(10), total_patients))
+        top_name, top_count, top_pct = top[0]
         
         return {
             "overview": {
                 "total_unique_diseases": len(disease_counts),
-                "total_cases": len(patients_df),
+                "total_cases": total_patients,
                 "most_common_disease": {
-                    "name": disease_counts.index[0],
-                    "count": int(disease_counts.iloc[0]),
-                    "percentage": round((disease_counts.iloc[0] / len(patients_df)) * 100, 2)
+                    "name": top_name,
+                    "count": top_count,
+                    "percentage": top_pct
                 }
             },
             "top_10_diseases": [
                 {
                     "rank": i + 1,
                     "disease_name": disease,
-                    "case_count": int(count),
-                    "percentage": round((count / len(patients_df)) * 100, 2)
+                    "case_count": count,
+                    "percentage": pct
                 }
-                for i, (disease, count) in enumerate(disease_counts.head(10).items())
+                for i, (disease, count, pct) in enumerate(top)
             ],
-            "interpretation": f"The most prevalent disease is {disease_counts.index[0]} with {disease_counts.iloc[0]} cases, "
-                            f"representing {round((disease_counts.iloc[0] / len(patients_df)) * 100, 2)}% of all patient visits. "
+            "interpretation": f"The most prevalent disease is {top_name} with {top_count} cases, "
+                            f"representing {top_pct}% of all patient visits. "
                             f"This indicates a significant health concern that requires focused medical resources and preventive measures."
         }
     
-    def _analyze_doctor_workload(self, patients_df, doctors_df):
+    def _analyze_doctor_workload(self, workload, patients_df, doctors_df):
         """Analyze doctor workload distribution"""
-        workload = patients_df['doctor_name'].value_counts()
         avg_load = workload.mean()
         
+        # Specialty lookups built once: doctors table first, patients as fallback
+        doc_specialty = doctors_df.drop_duplicates('doctor_name').set_index('doctor_name')['specialty'].to_dict()
+        patient_specialty = patients_df.drop_duplicates('doctor_name').set_index('doctor_name')['specialty'].to_dict()
+        
         # Get doctor details
+        top = list(self._with_percentages(workload.head(10), avg_load))
         doctor_workload = []
-        for i, (doc_name, count) in enumerate(workload.head(10).items()):
-            # Get specialty from doctors_df or patients_df
-            doc_info = doctors_df[doctors_df['doctor_name'] == doc_name]
-            if not doc_info.empty:
-                specialty = doc_info['specialty'].iloc[0]
-            else:
-                # Fallback to patients_df
-                specialty_info = patients_df[patients_df['doctor_name'] == doc_name]['specialty'].iloc[0] if len(patients_df[patients_df['doctor_name'] == doc_name]) > 0 else "Unknown"
-                specialty = specialty_info
+        for i, (doc_name, count, load_pct) in enumerate(top):
+            specialty = doc_specialty.get(doc_name) or patient_specialty.get(doc_name, "Unknown")
             
             doctor_workload.append({
                 "rank": i + 1,
                 "doctor_name": doc_name,
                 "specialty": specialty,
-                "patient_count": int(count),
-                "load_vs_average": round((count / avg_load) * 100, 2)
+                "patient_count": count,
+                "load_vs_average": load_pct
             })
         
         return {
@@ -102,51 +147,48 @@ class JSONKnowledgeBaseGenerator:
                 "total_doctors": len(doctors_df),
                 "average_patients_per_doctor": round(avg_load, 2),
                 "busiest_doctor": {
-                    "doctor_name": workload.index[0],
-                    "patient_count": int(workload.iloc[0])
+                    "doctor_name": top[0][0],
+                    "patient_count": top[0][1]
                 }
             },
             "top_10_busiest_doctors": doctor_workload,
             "interpretation": f"The average workload is {round(avg_load, 2)} patients per doctor. "
-                            f"The busiest doctor ({workload.index[0]}) has {workload.iloc[0]} patients, "
-                            f"which is {round((workload.iloc[0] / avg_load) * 100, 2)}% of the average load. "
+                            f"The busiest doctor ({top[0][0]}) has {top[0][1]} patients, "
+                            f"which is {top[0][2]}% of the average load. "
                             f"This suggests potential workload imbalance that may require staff redistribution."
         }
     
-    def _analyze_geographic_distribution(self, patients_df, branches_df):
+    def _analyze_geographic_distribution(self, area_counts, branch_counts, total_patients, branches_df):
         """Analyze patient geographic distribution"""
-        area_counts = patients_df['area'].value_counts()
-        branch_counts = patients_df['branch_name'].value_counts()
+        top = list(self._with_percentages(area_counts.head(10), total_patients))
+        top_area, top_count, top_pct = top[0]
         
         return {
             "overview": {
                 "total_areas_served": len(area_counts),
                 "total_branches": len(branches_df),
                 "most_served_area": {
-                    "area_name": area_counts.index[0],
-                    "patient_count": int(area_counts.iloc[0]),
-                    "percentage": round((area_counts.iloc[0] / len(patients_df)) * 100, 2)
+                    "area_name": top_area,
+                    "patient_count": top_count,
+                    "percentage": top_pct
                 }
             },
             "top_10_areas": [
                 {
                     "rank": i + 1,
                     "area_name": area,
-                    "patient_count": int(count),
-                    "percentage": round((count / len(patients_df)) * 100, 2)
+                    "patient_count": count,
+                    "percentage": pct
                 }
-                for i, (area, count) in enumerate(area_counts.head(10).items())
+                for i, (area, count, pct) in enumerate(top)
             ],
-            "branch_distribution": [
-                {
-                    "branch_name": branch_name,
-                    "patient_count": int(count),
-                    "percentage": round((count / len(patients_df)) * 100, 2)
-                }
-                for branch_name, count in branch_counts.items()
-            ],
-            "interpretation": f"The area with the highest patient volume is {area_counts.index[0]} with {area_counts.iloc[0]} patients. "
-                            f"This represents {round((area_counts.iloc[0] / len(patients_df)) * 100, 2)}% of total patient traffic, "
+            "branch_distribution": pd.DataFrame({
+                "branch_name": branch_counts.index.astype(str),
+                "patient_count": branch_counts.to_numpy(),
+                "percentage": (branch_counts.to_numpy() * (100.0 / total_patients)).round(2)
+            }).to_dict(orient='records'),
+            "interpretation": f"The area with the highest patient volume is {top_area} with {top_count} patients. "
+                            f"This represents {top_pct}% of total patient traffic, "
                             f"indicating this is a primary catchment area requiring adequate medical infrastructure."
         }
     
@@ -158,64 +200,49 @@ class JSONKnowledgeBaseGenerator:
                 "interpretation": "Visit timestamp information is not present in the current dataset."
             }
         
-        patients_df_copy = patients_df.copy()
-        patients_df_copy['visit_date'] = pd.to_datetime(patients_df_copy['visit_timestamp'], errors='coerce')
-        daily_counts = patients_df_copy.groupby(patients_df_copy['visit_date'].dt.date).size()
+        # Parse the one column and count on datetime64 day keys (no frame copy)
+        ts = pd.to_datetime(patients_df['visit_timestamp'], errors='coerce')
+        daily_counts = ts.dt.normalize().value_counts().sort_index()
+        peak_day = daily_counts.idxmax().date()
         
         return {
             "overview": {
                 "total_days_recorded": len(daily_counts),
                 "average_daily_visits": round(daily_counts.mean(), 2),
                 "peak_day": {
-                    "date": str(daily_counts.idxmax()),
+                    "date": str(peak_day),
                     "visit_count": int(daily_counts.max())
                 }
             },
-            "interpretation": f"Peak traffic occurred on {daily_counts.idxmax()} with {daily_counts.max()} visits. "
+            "interpretation": f"Peak traffic occurred on {peak_day} with {daily_counts.max()} visits. "
                             f"The average daily visit count is {round(daily_counts.mean(), 2)}. "
                             f"Understanding these patterns helps optimize staff scheduling and resource allocation."
         }
     
     def _format_doctors(self, doctors_df):
         """Format doctor information"""
-        return [
-            {
-                "doctor_id": row['doctor_id'],
-                "name": row['doctor_name'],
-                "specialty": row['specialty']
-            }
-            for _, row in doctors_df.iterrows()
-        ]
+        return (doctors_df[['doctor_id', 'doctor_name', 'specialty']]
+                .rename(columns={'doctor_name': 'name'})
+                .to_dict(orient='records'))
     
     def _format_branches(self, branches_df):
         """Format branch information"""
-        return [
-            {
-                "branch_id": row['branch_id'],
-                "branch_name": row['branch_name'],
-                "area": row['area']
-            }
-            for _, row in branches_df.iterrows()
-        ]
+        return branches_df[['branch_id', 'branch_name', 'area']].to_dict(orient='records')
     
     def _format_diseases(self, diseases_df):
         """Format disease information"""
-        return [
-            {
-                "disease_name": row['canonical_name'],
-                "category": row['category']
-            }
-            for _, row in diseases_df.iterrows()
-        ]
+        return (diseases_df[['canonical_name', 'category']]
+                .rename(columns={'canonical_name': 'disease_name'})
+                .to_dict(orient='records'))
     
-    def _generate_summary(self, patients_df, doctors_df, branches_df, diseases_df):
+    def _generate_summary(self, counts, total_patients, doctors_df, branches_df):
         """Generate executive summary"""
-        disease_counts = patients_df['disease_name'].value_counts()
-        workload = patients_df['doctor_name'].value_counts()
-        area_counts = patients_df['area'].value_counts()
+        disease_counts = counts['disease']
+        workload = counts['doctor']
+        area_counts = counts['area']
         
         return {
-            "total_patients": len(patients_df),
+            "total_patients": total_patients,
             "total_doctors": len(doctors_df),
             "total_branches": len(branches_df),
             "total_diseases_recorded": len(disease_counts),
@@ -232,10 +259,10 @@ if __name__ == "__main__":
     generator = JSONKnowledgeBaseGenerator()
     
     # Load data
-    doctors = pd.read_csv("data/cleaned/doctors.csv")
-    branches = pd.read_csv("data/cleaned/branches.csv")
-    diseases = pd.read_csv("data/cleaned/diseases.csv")
-    appointments = pd.read_csv("data/cleaned/appointments.csv")
+    doctors = pd.read_parquet("data/cleaned/doctors.parquet")
+    branches = pd.read_parquet("data/cleaned/branches.parquet")
+    diseases = pd.read_parquet("data/cleaned/diseases.parquet")
+    appointments = pd.read_parquet("data/cleaned/appointments.parquet", columns=KB_PATIENT_COLUMNS)
     
     # Generate KB
     kb = generator.generate_from_data(doctors, branches, diseases, appointments)
@@ -5,76 +5,81 @@ Refactored LLM Generator with JSON KB Support
 - Analytics-driven responses
 """
 import os
-import json
+import atexit
+import sqlite3
+import re
 import hashlib
+import functools
 import time
 import concurrent.futures
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load env variables
+# Load env variables (module bodies run once per interpreter, so no guard needed)
 load_dotenv()
 
 # Check Gemini API availability
+# google.generativeai (gRPC + protobuf) is heavy, so it is only imported when
+# the model is first initialized - see LLMGenerator._genai
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GENAI_AVAILABLE = bool(GEMINI_API_KEY)
+GEMINI_MAX_WORKERS = int(os.getenv("GEMINI_MAX_WORKERS", 40))
 
-try:
-    if GEMINI_API_KEY:
-        import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-        GENAI_AVAILABLE = True
-    else:
-        GENAI_AVAILABLE = False
-except Exception:
-    GENAI_AVAILABLE = False
+
+# Known context section headers, in build order
+SECTION_HEADERS = [
+    "=== ANALYTICS SUMMARY ===",
+    "=== DISEASE TRENDS ===",
+    "=== DOCTOR WORKLOAD ===",
+    "=== GEOGRAPHIC DISTRIBUTION ==="
+]
+_HEADER_RE = re.compile("|".join(map(re.escape, SECTION_HEADERS)))
+
+
+@functools.lru_cache(maxsize=8)
+def _split_sections(ctx):
+    """{header: section text} for a context string, parsed in one pass"""
+    matches = list(_HEADER_RE.finditer(ctx))
+    sections = {}
+    for m, nxt in zip(matches, matches[1:] + [None]):
+        # First occurrence of a header wins; each section runs to the next header
+        sections.setdefault(m.group(0), ctx[m.start():nxt.start() if nxt else len(ctx)].strip())
+    return sections
 
 
 class LLMGenerator:
+    # Gemini models to try, in order of preference
+    CANDIDATE_MODELS = [
+        "gemini-2.5-flash",
+        "gemini-2.0-flash",
+        "gemini-2.0-flash-lite-preview-02-05",
+        "gemini-2.0-flash-001"
+    ]
+
     def __init__(self):
         self.cache_dir = Path("data/cache")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.cache_file = self.cache_dir / "llm_cache.json"
-        self.cache = self._load_cache()
+        self.cache_file = self.cache_dir / "llm_cache.db"
+        self._cache_lock = threading.Lock()
+        self._ctx_hash = None  # (context prefix, digest) of the last context seen
 
-        # Initialize Gemini model if available
+        # Gemini model is created once by init_model() (app startup or first use)
         self.api_available = False
         self.model = None
         self.rate_limited_until = None
-
-        if GENAI_AVAILABLE:
-            try:
-                # List of models to try in order of preference
-                candidate_models = [
-                    "gemini-2.5-flash",
-                    "gemini-2.0-flash",
-                    "gemini-2.0-flash-lite-preview-02-05",
-                    "gemini-2.0-flash-001"
-                ]
-                
-                selected_model = None
-                for model_name in candidate_models:
-                    try:
-                        # Test if model works
-                        test_model = genai.GenerativeModel(model_name)
-                        # Quick generation test to fail fast if model not found/supported
-                        test_model.generate_content("test") 
-                        selected_model = model_name
-                        self.model = test_model
-                        print(f"Gemini API initialized successfully ({selected_model})")
-                        self.api_available = True
-                        break
-                    except Exception as e:
-                        print(f"Model {model_name} failed: {e}")
-                        continue
-                
-                if not self.api_available:
-                    print("All Gemini models failed to initialize.")
-
-            except Exception as e:
-                print(f"Gemini initialization failed: {e}")
-                self.api_available = False
-        else:
-            print("Gemini API not available - using fallback extraction")
+        self._model_initialized = False
+        self._model_lock = threading.Lock()
+        self.selected_model_file = self.cache_dir / "selected_model.txt"
+        self._saved_model = None
+        self._model_index = 0
+
+        # One pool for all API calls, sized to the server's request concurrency
+        # (Starlette's threadpool allows 40) so calls never wait in its queue
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=GEMINI_MAX_WORKERS, thread_name_prefix="gemini"
+        )
+        atexit.register(self._executor.shutdown, wait=False)
 
         self.system_prompt = """
 You are an expert AI Analytics Assistant for the Saylani Medical Help Desk.
@@ -95,30 +100,170 @@ FORMAT:
 - End with a 1-2 line insight summary
 """
 
+        # Constant prompt scaffolding; each request only joins in the context and question
+        self._prompt_prefix = f"\n{self.system_prompt}\n\n=== ANALYTICS DATA START ===\n"
+        self._prompt_mid = "\n=== ANALYTICS DATA END ===\n\nADMIN QUESTION:\n"
+        self._prompt_suffix = "\n\nANSWER (interpret analytics only):\n"
+
+    # -------------------------------------
+    # MODEL INITIALIZATION
+    # -------------------------------------
+    def init_model(self):
+        """Construct the Gemini model once (no network call); safe to call repeatedly"""
+        with self._model_lock:
+            if self._model_initialized:
+                return self.api_available
+            self._model_initialized = True
+
+            if self._genai is None:
+                print("Gemini API not available - using fallback extraction")
+                return False
+
+            # Start from the model that worked last time, if any; unsupported
+            # models are skipped lazily by _generate on the first real request
+            try:
+                saved = self.selected_model_file.read_text(encoding="utf-8").strip()
+            except OSError:
+                saved = None
+            self._saved_model = saved
+            self._model_index = self.CANDIDATE_MODELS.index(saved) if saved in self.CANDIDATE_MODELS else 0
+            return self._build_model()
+
+    def _build_model(self):
+        """Create the model for the current candidate; caller holds _model_lock"""
+        model_name = self.CANDIDATE_MODELS[self._model_index]
+        try:
+            self.model = self._genai.GenerativeModel(model_name)
+            self.api_available = True
+            print(f"Gemini API initialized ({model_name})")
+        except Exception as e:
+            print(f"Gemini initialization failed: {e}")
+            self.model = None
+            self.api_available = False
+        return self.api_available
+
+    def _next_model(self, failed_model):
+        """Move to the next candidate after failed_model was rejected; False when none are left"""
+        with self._model_lock:
+            if self.model is not failed_model:
+                # Another request already moved on
+                return self.model is not None
+            print(f"Model {self.CANDIDATE_MODELS[self._model_index]} unavailable")
+            self._model_index += 1
+            if self._model_index >= len(self.CANDIDATE_MODELS):
+                print("All Gemini models failed to initialize.")
+                self.model = None
+                self.api_available = False
+                return False
+            return self._build_model()
+
+    def _remember_model(self):
+        """Persist the working model name so the next boot starts with it"""
+        model_name = self.CANDIDATE_MODELS[self._model_index]
+        if model_name != self._saved_model:
+            try:
+                self.selected_model_file.write_text(model_name, encoding="utf-8")
+                self._saved_model = model_name
+            except OSError as e:
+                print(f"Could not save selected model: {e}")
+
+    @staticmethod
+    def _is_model_error(e):
+        """True for errors meaning the model itself is unknown or unsupported"""
+        msg = str(e).lower()
+        return "404" in msg or "not found" in msg or "not supported" in msg
+
+    def _generate(self, prompt, timeout):
+        """generate_content with a timeout, falling through unavailable candidate models"""
+        while True:
+            model = self.model
+            try:
+                # The SDK timeout ends a slow call on the wire; the future timeout
+                # is only a backstop, and a still-queued call is cancelled
+                future = self._executor.submit(
+                    model.generate_content, prompt, request_options={"timeout": timeout}
+                )
+                try:
+                    response = future.result(timeout=timeout + 1)
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    raise
+            except Exception as e:
+                if self._is_model_error(e) and self._next_model(model):
+                    continue
+                raise
+            self._remember_model()
+            return response
+
+    @functools.cached_property
+    def _genai(self):
+        """google.generativeai, imported and configured on first use; None without a key"""
+        if not GENAI_AVAILABLE:
+            return None
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            return genai
+        except Exception as e:
+            print(f"Gemini SDK import/configure failed: {e}")
+            return None
+
     # -------------------------------------
     # CACHE HELPERS
     # -------------------------------------
     def _load_cache(self):
-        if self.cache_file.exists():
+        """Open the SQLite answer cache; entries are read and written per key"""
+        try:
+            db = sqlite3.connect(self.cache_file, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)")
+            return db
+        except sqlite3.Error as e:
+            print(f"Cache open failed: {e}")
+            return None
+
+    @functools.cached_property
+    def cache(self):
+        """Answer cache connection, opened on first lookup (under _cache_lock)"""
+        return self._load_cache()
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            db = self.cache
+            if db is None:
+                return None
             try:
-                with open(self.cache_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+                row = db.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                # Locked/busy/corrupt cache: treat as a miss rather than failing the query
+                print(f"Cache lookup failed: {e}")
+                return None
+        return row[0] if row else None
 
-    def _save_cache(self):
+    def _save_cache(self, items):
+        """Insert or replace (key, answer) pairs in one transaction"""
+        if not items:
+            return
         try:
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
-        except Exception as e:
+            with self._cache_lock:
+                db = self.cache
+                if db is None:
+                    return
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", items)
+        except sqlite3.Error as e:
             print(f"Cache save failed: {e}")
 
     def _get_cache_key(self, query, context_text):
         if context_text is None:
             context_text = ""
-        base = f"{query}|{context_text[:500]}"
-        return hashlib.md5(base.encode()).hexdigest()
+        # The context prefix is the same for every query against one KB, so
+        # its digest is kept and only the query is hashed per call
+        prefix = context_text[:500]
+        ctx_hash = self._ctx_hash
+        if ctx_hash is None or ctx_hash[0] != prefix:
+            ctx_hash = self._ctx_hash = (prefix, hashlib.blake2b(prefix.encode(), digest_size=16).digest())
+        return hashlib.blake2b(query.encode() + ctx_hash[1], digest_size=16).hexdigest()
 
     # -------------------------------------
     # MAIN RESPONSE GENERATION
@@ -130,55 +275,49 @@ FORMAT:
         cache_key = self._get_cache_key(query, context_text)
 
         # Serve from cache
-        if cache_key in self.cache:
+        cached = self._cache_get(cache_key)
+        if cached is not None:
             print("Using cached response")
-            return self.cache[cache_key]
+            return cached
 
         # TRY GEMINI API FIRST - respect rate-limit and user model selection
-        now = time.time()
-        if self.rate_limited_until and now < self.rate_limited_until:
-            print("Gemini API currently rate-limited; using fallback KB extraction")
-        elif self.api_available and self.model:
+        if self._api_ready():
             try:
-                prompt = f"""
-{self.system_prompt}
-
-=== ANALYTICS DATA START ===
-{context_text}
-=== ANALYTICS DATA END ===
+                prompt = "".join((self._prompt_prefix, context_text, self._prompt_mid, query, self._prompt_suffix))
 
-ADMIN QUESTION:
-{query}
-
-ANSWER (interpret analytics only):
-"""
-
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(self.model.generate_content, prompt)
-                    response = future.result(timeout=8)
+                response = self._generate(prompt, timeout=8)
 
                 answer = response.text
 
                 # Cache
-                self.cache[cache_key] = answer
-                self._save_cache()
+                self._save_cache([(cache_key, answer)])
 
                 print("Gemini Response Generated")
                 return answer
 
-            except concurrent.futures.TimeoutError:
-                print("API Timeout - using fallback KB extraction")
             except Exception as e:
-                # Detect 429 (resource exhausted) and set a cooldown
-                if "429" in str(e) or "Resource exhausted" in str(e):
-                    self.rate_limited_until = time.time() + 300  # 5-minute pause
-                    print("API Failure: 429 Resource exhausted - entering cooldown (5 min)")
-                else:
-                    print(f"API Failure: {e}")
+                self._handle_api_error(e)
 
         # FALLBACK - use knowledge-base extraction
         return self._extract_from_context(query, context_text)
 
+    def _api_ready(self):
+        self.init_model()
+        if self.rate_limited_until and time.time() < self.rate_limited_until:
+            print("Gemini API currently rate-limited; using fallback KB extraction")
+            return False
+        return bool(self.api_available and self.model)
+
+    def _handle_api_error(self, e):
+        if isinstance(e, concurrent.futures.TimeoutError):
+            print("API Timeout - using fallback KB extraction")
+        # Detect 429 (resource exhausted) and set a cooldown
+        elif "429" in str(e) or "Resource exhausted" in str(e):
+            self.rate_limited_until = time.time() + 300  # 5-minute pause
+            print("API Failure: 429 Resource exhausted - entering cooldown (5 min)")
+        else:
+            print(f"API Failure: {e}")
+
     # -------------------------------------
     # FALLBACK ANALYTICS EXTRACTION
     # -------------------------------------
@@ -188,55 +327,29 @@ ANSWER (interpret analytics only):
         
         relevant_sections = []
 
-        def extract_section(title, next_titles):
-            try:
-                start = ctx.find(title)
-                if start == -1:
-                    return None
-                
-                # Search for the *nearest* next title from the list of possible next titles
-                end = len(ctx)
-                start_search_pos = start + len(title)
-                
-                for next_title in next_titles:
-                   next_pos = ctx.find(next_title, start_search_pos)
-                   if next_pos != -1 and next_pos < end:
-                       end = next_pos
-                
-                return ctx[start:end].strip()
-            except Exception as e:
-                print(f"Extraction error: {e}")
-                return None
-
-        # Define known section headers
-        HEADERS = [
-            "=== ANALYTICS SUMMARY ===",
-            "=== DISEASE TRENDS ===",
-            "=== DOCTOR WORKLOAD ===",
-            "=== GEOGRAPHIC DISTRIBUTION ==="
-        ]
+        sections = _split_sections(ctx)
 
         # 1. SUMMARY
         if any(w in q for w in ["summary", "overview", "total", "stats"]):
-            sec = extract_section("=== ANALYTICS SUMMARY ===", HEADERS)
+            sec = sections.get("=== ANALYTICS SUMMARY ===")
             if sec:
                 relevant_sections.append(f"**Executive Summary**\n{sec}")
 
         # 2. DISEASE
         if any(w in q for w in ["disease", "illness", "common", "prevalent", "top", "trend"]):
-            sec = extract_section("=== DISEASE TRENDS ===", HEADERS)
+            sec = sections.get("=== DISEASE TRENDS ===")
             if sec:
                 relevant_sections.append(f"**Disease Analysis**\n{sec}")
 
         # 3. DOCTOR
         if any(w in q for w in ["doctor", "staff", "workload", "busy", "visit", "schedule"]):
-            sec = extract_section("=== DOCTOR WORKLOAD ===", HEADERS)
+            sec = sections.get("=== DOCTOR WORKLOAD ===")
             if sec:
                 relevant_sections.append(f"**Staff Performance**\n{sec}")
         
         # 4. BRANCH / AREA
         if any(w in q for w in ["branch", "area", "location", "city", "geographic"]):
-            sec = extract_section("=== GEOGRAPHIC DISTRIBUTION ===", HEADERS)
+            sec = sections.get("=== GEOGRAPHIC DISTRIBUTION ===")
             if sec:
                 relevant_sections.append(f"**Geographic Reach**\n{sec}")
 
@@ -247,13 +360,13 @@ ANSWER (interpret analytics only):
         # DEFAULT FALLBACK: If nothing specific matched, show Summary + Key Insights
         # or if the query is very generic like "explain graphs"
         if "graph" in q or "chart" in q or "data" in q:
-             summary = extract_section("=== ANALYTICS SUMMARY ===", HEADERS)
-             trends = extract_section("=== DISEASE TRENDS ===", HEADERS)
+             summary = sections.get("=== ANALYTICS SUMMARY ===")
+             trends = sections.get("=== DISEASE TRENDS ===")
              if summary and trends:
                  return f"**Overview**\n{summary}\n\n**Trends**\n{trends}\n\n---\n*Extracted from Analytics Knowledge Base*"
 
         # Ultimate fallback
-        summary = extract_section("=== ANALYTICS SUMMARY ===", HEADERS)
+        summary = sections.get("=== ANALYTICS SUMMARY ===")
         return f"""
 **Analytics Information**
 
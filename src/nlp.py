@@ -2,6 +2,10 @@ import re
 from datetime import datetime
 
 class IntentParser:
+    SPECIALTIES = ["cardiology", "pediatrics", "dermatology", "neurology", "orthopedics", "general practice", "ophthalmology", "gynecology"]
+    AREAS = ["gulshan", "korangi", "saddar", "nazimabad", "malir", "clifton", "pechs"]
+    DISEASES = ["cold", "flu", "fever", "dengue", "fracture", "pain", "headache", "migraine"]
+
     def __init__(self):
         self.intents = {
             "book_appointment": [r"book", r"appointment", r"schedule", r"visit", r"see a doctor"],
@@ -9,15 +13,23 @@ class IntentParser:
             "get_info": [r"info", r"about", r"what is", r"tell me", r"symptoms", r"treatment"],
             "check_availability": [r"available", r"when", r"time", r"open"]
         }
+        # Compile once; parse() runs for every query. IGNORECASE instead of
+        # lowercasing each query
+        self.intents = {name: [re.compile(p, re.IGNORECASE) for p in pats] for name, pats in self.intents.items()}
+        self._doctor_pat = re.compile(r"dr\.?\s+([a-z]+(\s+[a-z]+)?)", re.IGNORECASE)
+        # Every entity keyword in one named-group alternation: one scan per query
+        self._entity_pat = re.compile("|".join(
+            f"(?P<{label}>{'|'.join(map(re.escape, keywords))})"
+            for label, keywords in (("SPECIALTY", self.SPECIALTIES), ("AREA", self.AREAS), ("DISEASE", self.DISEASES))
+        ), re.IGNORECASE)
         
     def parse(self, text):
-        text = text.lower()
         intent = "unknown"
         
         # Simple keyword matching for intent
         max_score = 0
         for int_name, keywords in self.intents.items():
-            score = sum(1 for k in keywords if re.search(k, text))
+            score = sum(1 for k in keywords if k.search(text))
             if score > max_score:
                 max_score = score
                 intent = int_name
@@ -29,27 +41,13 @@ class IntentParser:
         entities = {}
         
         # Extract Doctor Name (Dr. X)
-        doctor_match = re.search(r"dr\.?\s+([a-z]+(\s+[a-z]+)?)", text)
+        doctor_match = self._doctor_pat.search(text)
         if doctor_match:
             entities["DOCTOR_NAME"] = doctor_match.group(0).title()
             
-        # Extract Specialty (Simple list based)
-        specialties = ["cardiology", "pediatrics", "dermatology", "neurology", "orthopedics", "general practice", "ophthalmology", "gynecology"]
-        for s in specialties:
-            if s in text:
-                entities["SPECIALTY"] = s.title()
-                
-        # Extract Branch/Area (Simple heuristic)
-        areas = ["gulshan", "korangi", "saddar", "nazimabad", "malir", "clifton", "pechs"]
-        for a in areas:
-            if a in text:
-                entities["AREA"] = a.title()
-                
-        # Extract Disease (Simple heuristic)
-        diseases = ["cold", "flu", "fever", "dengue", "fracture", "pain", "headache", "migraine"]
-        for d in diseases:
-            if d in text:
-                entities["DISEASE"] = d.title()
+        # Extract Specialty, Branch/Area and Disease; the last mention of each wins
+        for match in self._entity_pat.finditer(text):
+            entities[match.lastgroup] = match.group(0).title()
                 
         return entities
 
@@ -0,0 +1,48 @@
+"""
+Keyword routing for /chat/query: medical questions must get the medical notice
+"""
+import os
+import sys
+
+import pytest
+
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("fastapi")
+from src.app import classify_query, tokenize_query
+
+
+def classify(query):
+    return classify_query(*tokenize_query(query))
+
+
+@pytest.mark.parametrize("query", [
+    "What helps with headaches?",
+    "I keep getting fevers at night",
+    "why do my joints have aches",
+    "pains in my chest",
+    "how do colds spread",
+    "which medication should I take",
+])
+def test_inflected_medical_terms_are_medical(query):
+    is_medical, is_analytics = classify(query)
+    assert is_medical
+    assert not is_analytics
+
+
+def test_analytics_query_is_not_medical():
+    assert classify("Which branch has the highest workload?") == (False, True)
+
+
+@pytest.mark.parametrize("query", [
+    "trending diseases this season",
+    "patient counts per branch",
+    "how compared are the doctors' workloads",
+    "averages across all areas",
+    "geographical spread of our patients",
+])
+def test_inflected_analytics_terms_are_analytics(query):
+    is_medical, is_analytics = classify(query)
+    assert is_analytics
+    assert not is_medical